@@ -187,7 +187,12 @@ def main():
     app.setFont(UiUtils.FONT)
     main_window.show()
     main_window.set_default_theme()
-    sys.exit(app.exec())
+    result = app.exec()
+
+    if logger.isEnabledFor(logging.DEBUG):
+        from cfclient.utils.periodictimer import dump_stats
+        logger.debug("Periodic timer stats:\n%s", dump_stats())
+    sys.exit(result)
 
 
 if __name__ == "__main__":
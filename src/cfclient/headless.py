@@ -26,14 +26,19 @@
 """
 Headless client for the Crazyflie.
 """
+import datetime
 import logging
 import os
 import signal
 import sys
+from threading import Event
 
 import cfclient.utils
 import cflib.crtp
+from cfclient.utils.config import Config
 from cfclient.utils.input import JoystickReader
+from cfclient.utils.logconfigreader import read_log_config
+from cfclient.utils.logdatawriter import LogWriter
 from cflib.crazyflie import Crazyflie
 
 if os.name == 'posix':
@@ -66,6 +71,12 @@ class HeadlessClient():
         for d in self._jr.available_devices():
             self._devs.append(d.name)
 
+        # Log blocks to record and their writers once connected
+        self._log_configs = []
+        self._log_writers = []
+        self._log_dir = None
+        self._stopped = Event()
+
     def setup_controller(self, input_config, input_device=0):
         """Set up the device reader"""
         # Set up the joystick reader
@@ -87,9 +98,19 @@ class HeadlessClient():
         for map in os.listdir(cfclient.config_path + '/input'):
             print(" - " + map.split(".json")[0])
 
+    def setup_recording(self, log_config_files, output_dir=None):
+        """
+        Record the log blocks in the log configuration files to output_dir
+        once connected, by default to the logdata directory of the client
+        """
+        for conf_file in log_config_files:
+            self._log_configs.append(read_log_config(conf_file))
+        self._log_dir = output_dir
+
     def connect_crazyflie(self, link_uri):
         """Connect to a Crazyflie on the given link uri"""
         self._cf.connection_failed.add_callback(self._connection_failed)
+        self._cf.connection_lost.add_callback(self._connection_lost)
         # 2014-11-25 chad: Add a callback for when we have a good connection.
         self._cf.connected.add_callback(self._connected)
         self._cf.param.add_update_callback(
@@ -103,9 +124,53 @@ class HeadlessClient():
         self._cf.open_link(link_uri)
         self._jr.input_updated.add_callback(self._cf.commander.send_setpoint)
 
+    def wait(self, duration=None):
+        """
+        Wait for duration seconds (forever if None), until the connection is
+        lost or until interrupted with Ctrl-C, then stop recording and
+        disconnect
+        """
+        signal.signal(signal.SIGINT, lambda signum, frame: self._stopped.set())
+        self._stopped.wait(duration)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        for conf, writer in self._log_writers:
+            conf.stop()
+            writer.stop()
+            if writer.dropped_samples():
+                print("Dropped {} samples of {}".format(
+                    writer.dropped_samples(), conf.name))
+        self._cf.close_link()
+
     def _connected(self, link):
         """Callback for a successful Crazyflie connection."""
         print("Connected to {}".format(link))
+        self._start_recording()
+
+    def _start_recording(self):
+        """Start the log blocks and write them to file"""
+        connected_ts = datetime.datetime.now()
+        for conf in self._log_configs:
+            try:
+                self._cf.log.add_config(conf)
+            except (KeyError, AttributeError) as e:
+                print("Could not record {}: {}".format(conf.name, e))
+                continue
+            writer = LogWriter(
+                conf, connected_ts, self._log_dir,
+                file_format=Config().get("log_file_format"),
+                compression=Config().get("log_file_compression"),
+                rotate_size=Config().get("log_file_rotate_size") * 1024 * 1024,
+                rotate_time=Config().get("log_file_rotate_time"))
+            writer.start()
+            self._log_writers.append((conf, writer))
+            conf.start()
+            print("Recording {}".format(conf.name))
+
+    def _connection_lost(self, link, message):
+        """Callback for a lost Crazyflie connection"""
+        print("Connection lost on {}: {}".format(link, message))
+        self._stopped.set()
 
     def _connection_failed(self, link, message):
         """Callback for a failed Crazyflie connection"""
@@ -140,6 +205,18 @@ def main():
     parser.add_argument("--controllers", action="store_true",
                         dest="list_controllers",
                         help="Only display available controllers and exit")
+    parser.add_argument("-l", "--log-config", action="append",
+                        dest="log_configs", default=[],
+                        help="Log configuration file to record, can be used "
+                             "several times")
+    parser.add_argument("-o", "--output", action="store", dest="output",
+                        type=str, default=None,
+                        help="Directory to write the recorded log data to, "
+                             "defaults to the logdata directory in the "
+                             "client configuration directory")
+    parser.add_argument("-t", "--duration", action="store", dest="duration",
+                        type=float, default=None,
+                        help="Disconnect and exit after this many seconds")
     (args, unused) = parser.parse_known_args()
 
     if args.debug:
@@ -155,9 +232,16 @@ def main():
         if headless.controller_connected():
             headless.setup_controller(input_config=args.input,
                                       input_device=args.controller)
-            headless.connect_crazyflie(link_uri=args.uri)
+        elif args.log_configs:
+            print("No input-device connected, only recording")
         else:
             print("No input-device connected, exiting!")
+            return
+
+        headless.setup_recording(args.log_configs, args.output)
+        headless.connect_crazyflie(link_uri=args.uri)
+        if args.log_configs or args.duration is not None:
+            headless.wait(args.duration)
 
 
 if __name__ == "__main__":
@@ -29,8 +29,8 @@ import logging
 
 import cfclient
 from cfclient.utils.logconfigreader import FILE_REGEX_YAML
+from cfclient.utils.uicache import load_ui_type
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 from PyQt6.QtCore import QAbstractTableModel, QVariant, Qt
 from PyQt6.QtGui import QBrush, QColor
 from PyQt6.QtWidgets import QInputDialog, QFileDialog
@@ -43,7 +43,7 @@ __all__ = ['AnchorPositionDialog']
 logger = logging.getLogger(__name__)
 
 (anchor_postiong_widget_class, connect_widget_base_class) = (
-    uic.loadUiType(
+    load_ui_type(
         cfclient.module_path + '/ui/dialogs/anchor_position_dialog.ui')
 )
 
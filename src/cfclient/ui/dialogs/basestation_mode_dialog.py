@@ -28,20 +28,20 @@ Toolbox used to interact with the Basestation to set it in a certain channel
 """
 
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 from PyQt6.QtCore import Qt
 
 import io
 import serial
 from serial.tools.list_ports import comports
 import cfclient
+from cfclient.utils.uicache import load_ui_type
 import time
 
 
 __author__ = 'Bitcraze AB'
 __all__ = ['LighthouseBsModeDialog']
 
-(basestation_mode_widget_class, connect_widget_base_class) = uic.loadUiType(
+(basestation_mode_widget_class, connect_widget_base_class) = load_ui_type(
     cfclient.module_path + "/ui/dialogs/basestation_mode_dialog.ui")
 
 
@@ -44,10 +44,11 @@ from urllib.request import urlopen
 from urllib.error import URLError
 import zipfile
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 from PyQt6.QtCore import pyqtSlot, pyqtSignal, QThread
 
 import cfclient
+from cfclient.utils.uicache import load_ui_type
 import cflib.crazyflie
 
 __author__ = 'Bitcraze AB'
@@ -55,8 +56,8 @@ __all__ = ['BootloaderDialog']
 
 logger = logging.getLogger(__name__)
 
-service_dialog_class = uic.loadUiType(cfclient.module_path +
-                                      "/ui/dialogs/bootloader.ui")[0]
+service_dialog_class = load_ui_type(cfclient.module_path +
+                                    "/ui/dialogs/bootloader.ui")[0]
 
 # This url is used to fetch all the releases from the FirmwareDownloader
 RELEASE_URL = 'https://api.github.com/repos/bitcraze/'\
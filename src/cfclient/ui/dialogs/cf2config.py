@@ -30,10 +30,10 @@ read/write the configuration block in the Crazyflie flash.
 import logging
 
 import cfclient
+from cfclient.utils.uicache import load_ui_type
 from cflib.crazyflie.mem import MemoryElement
 
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal
 
 __author__ = 'Bitcraze AB'
@@ -41,8 +41,8 @@ __all__ = ['Cf2ConfigDialog']
 
 logger = logging.getLogger(__name__)
 
-service_dialog_class = uic.loadUiType(cfclient.module_path +
-                                      "/ui/dialogs/cf2config.ui")[0]
+service_dialog_class = load_ui_type(cfclient.module_path +
+                                    "/ui/dialogs/cf2config.ui")[0]
 
 
 class Cf2ConfigDialog(QtWidgets.QWidget, service_dialog_class):
@@ -36,8 +36,8 @@ from PyQt6.QtCore import QTimer
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QMessageBox
 from cfclient.utils.config_manager import ConfigManager
+from cfclient.utils.uicache import load_ui_type
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 
 __author__ = 'Bitcraze AB'
 __all__ = ['InputConfigDialogue']
@@ -45,7 +45,7 @@ __all__ = ['InputConfigDialogue']
 logger = logging.getLogger(__name__)
 
 (inputconfig_widget_class, connect_widget_base_class) = (
-    uic.loadUiType(cfclient.module_path + '/ui/dialogs/inputconfigdialogue.ui')
+    load_ui_type(cfclient.module_path + '/ui/dialogs/inputconfigdialogue.ui')
 )
 
 
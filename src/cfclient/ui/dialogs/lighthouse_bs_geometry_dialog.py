@@ -29,12 +29,12 @@ import logging
 
 import cfclient
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 from PyQt6.QtCore import QVariant, Qt, QAbstractTableModel, pyqtSignal
 from cflib.localization import LighthouseBsGeoEstimator
 from cflib.localization import LighthouseSweepAngleAverageReader
 from cflib.crazyflie.mem import LighthouseBsGeometry
 from cfclient.ui.wizards.lighthouse_geo_bs_estimation_wizard import LighthouseBasestationGeometryWizard
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['LighthouseBsGeometryDialog']
@@ -42,7 +42,7 @@ __all__ = ['LighthouseBsGeometryDialog']
 logger = logging.getLogger(__name__)
 
 (basestation_geometry_widget_class, connect_widget_base_class) = (
-    uic.loadUiType(
+    load_ui_type(
         cfclient.module_path + '/ui/dialogs/lighthouse_bs_geometry_dialog.ui')
 )
 
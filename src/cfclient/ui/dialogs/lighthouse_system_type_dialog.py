@@ -28,8 +28,8 @@ Dialog box used to change lighthouse system type. Used from the lighthouse tab.
 import logging
 
 import cfclient
+from cfclient.utils.uicache import load_ui_type
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 
 __author__ = 'Bitcraze AB'
 __all__ = ['LighthouseSystemTypeDialog']
@@ -37,7 +37,7 @@ __all__ = ['LighthouseSystemTypeDialog']
 logger = logging.getLogger(__name__)
 
 (lighthouse_system_widget_class, connect_widget_base_class) = (
-    uic.loadUiType(
+    load_ui_type(
         cfclient.module_path + '/ui/dialogs/lighthouse_system_type_dialog.ui')
 )
 
@@ -36,7 +36,8 @@ import struct
 
 import cfclient
 from cfclient.utils.ui import UiUtils
-from PyQt6 import QtWidgets, uic
+from cfclient.utils.uicache import load_ui_type
+from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QShortcut, QKeySequence
 
@@ -48,7 +49,7 @@ __all__ = ['LogConfigDialogue']
 logger = logging.getLogger(__name__)
 
 (logconfig_widget_class, connect_widget_base_class) = (
-    uic.loadUiType(cfclient.module_path + '/ui/dialogs/logconfigdialogue.ui'))
+    load_ui_type(cfclient.module_path + '/ui/dialogs/logconfigdialogue.ui'))
 
 NAME_FIELD = 0
 ID_FIELD = 1
@@ -564,7 +565,8 @@ class LogConfigDialogue(QtWidgets.QWidget, logconfig_widget_class):
         for logconfig in self.helper.cf.log.log_blocks:
             config_to_delete = self._parse_configname(logconfig)
             if config_to_delete == conf_name:
-                self.helper.plotTab.remove_config(logconfig)
+                if self.helper.plotTab:
+                    self.helper.plotTab.remove_config(logconfig)
                 self.helper.cf.log.log_blocks.remove(logconfig)
                 logconfig.delete()
 
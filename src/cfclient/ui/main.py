@@ -28,10 +28,14 @@ The main file for the Crazyflie control application.
 """
 import logging
 import sys
+import time
 import usb
+from collections import deque
+from threading import Lock
 
 import cfclient
 from cfclient.ui.pose_logger import PoseLogger
+from cfclient.ui.startup import StartupPipeline
 from cfclient.ui.tab_toolbox import TabToolbox
 import cfclient.ui.tabs
 import cflib.crtp
@@ -43,17 +47,18 @@ from cfclient.utils.config_manager import ConfigManager
 from cfclient.utils.input import JoystickReader
 from cfclient.utils.logconfigreader import LogConfigReader
 from cfclient.utils.ui import UiUtils
+from cfclient.utils.uicache import load_ui_type
 from cfclient.utils.zmq_led_driver import ZMQLEDDriver
 from cfclient.utils.zmq_param import ZMQParamAccess
 from cflib.crazyflie import Crazyflie
 from cflib.crazyflie.log import LogConfig
 from cflib.crazyflie.mem import MemoryElement
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtCore import pyqtSlot
 from PyQt6.QtCore import QDir
 from PyQt6.QtCore import QThread
+from PyQt6.QtCore import QTimer
 from PyQt6.QtCore import QUrl
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QAction
@@ -64,6 +69,7 @@ from PyQt6.QtGui import QPalette
 from PyQt6.QtWidgets import QLabel
 from PyQt6.QtWidgets import QMenu
 from PyQt6.QtWidgets import QMessageBox
+from PyQt6.QtWidgets import QProgressBar
 
 from .dialogs.cf2config import Cf2ConfigDialog
 from .dialogs.inputconfigdialogue import InputConfigDialogue
@@ -75,9 +81,13 @@ __all__ = ['MainUI']
 
 logger = logging.getLogger(__name__)
 
+# Number of console printouts from the Crazyflie kept for tabs that are
+# created after they were received
+CONSOLE_HISTORY_SIZE = 1000
+
 (main_window_class,
- main_windows_base_class) = (uic.loadUiType(cfclient.module_path +
-                                            '/ui/main.ui'))
+ main_windows_base_class) = (load_ui_type(cfclient.module_path +
+                                          '/ui/main.ui'))
 
 
 class UIState:
@@ -105,6 +115,7 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
     _log_error_signal = pyqtSignal(object, str)
 
     def __init__(self, *args):
+        startup_start = time.perf_counter()
         super(MainUI, self).__init__(*args)
         self.setupUi(self)
 
@@ -144,7 +155,9 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
         self.bgColor = self._statusbar_label.palette().color(QPalette.ColorRole.Window)
         self.isDark = self.textColor.value() > self.bgColor.value()
 
-        self.joystickReader = JoystickReader()
+        # The input maps are loaded and the devices discovered in the
+        # background once the window is shown, see _start_background_init()
+        self.joystickReader = JoystickReader(deferred=True)
         self._active_device = ""
         # self.configGroup = QActionGroup(self._menu_mappings, exclusive=True)
 
@@ -223,6 +236,11 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
         self.connectionInitiatedSignal.connect(self._connection_initiated)
         self._log_error_signal.connect(self._logging_error)
 
+        # Called from the link thread
+        self._console_history = deque(maxlen=CONSOLE_HISTORY_SIZE)
+        self._console_history_lock = Lock()
+        self.cf.console.receivedChar.add_callback(self._console_received)
+
         self.batteryBar.setTextVisible(False)
         self.linkQualityBar.setTextVisible(False)
 
@@ -232,7 +250,7 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
             lambda percentage: self.linkQualityBar.setValue(int(percentage)))
 
         # Parse the log configuration files
-        self.logConfigReader = LogConfigReader(self.cf)
+        self.logConfigReader = LogConfigReader(self.cf, deferred=True)
 
         self._current_input_config = None
         self._active_config = None
@@ -259,7 +277,6 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
         self._connectivity_manager.set_address(self.address.value())
 
         self._initial_scan = True
-        self._scan(self._connectivity_manager.get_address())
 
         self.tabs_menu_item = QMenu("Tabs", self.menuView, enabled=True)
         self.menuView.addMenu(self.tabs_menu_item)
@@ -270,7 +287,10 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
         self.loaded_tab_toolboxes = self.create_tab_toolboxes(self.tabs_menu_item,
                                                               self.toolboxes_menu_item,
                                                               self.tab_widget)
-        self.read_tab_toolbox_config(self.loaded_tab_toolboxes)
+        for descriptor in cfclient.ui.tabs.available:
+            if descriptor.eager:
+                self._get_tab_toolbox(descriptor)
+        self.read_tab_toolbox_config()
 
         # References to all the device sub-menus in the "Input device" menu
         self._all_role_menus = ()
@@ -320,48 +340,189 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
         # We only want to warn about USB permission once
         self._permission_warned = False
 
-    def create_tab_toolboxes(self, tabs_menu_item, toolboxes_menu_item, tab_widget):
-        loaded_tab_toolboxes = {}
+        self._startup_time = time.perf_counter() - startup_start
+        self._report_startup_times()
 
-        for tab_class in cfclient.ui.tabs.available:
-            tab_toolbox = tab_class(cfclient.ui.pluginhelper)
-            loaded_tab_toolboxes[tab_toolbox.get_tab_toolbox_name()] = tab_toolbox
+        # Started from the event loop, so once the window is shown
+        self._startup_progress = QProgressBar()
+        self._startup_progress.setTextVisible(True)
+        self._startup_progress.hide()
+        self.statusBar().addPermanentWidget(self._startup_progress)
+        self._startup = StartupPipeline()
+        QTimer.singleShot(0, self._start_background_init)
 
-            # Set reference for plot-tab.
-            if isinstance(tab_toolbox, cfclient.ui.tabs.PlotTab):
-                cfclient.ui.pluginhelper.plotTab = tab_toolbox
+    def create_tab_toolboxes(self, tabs_menu_item, toolboxes_menu_item, tab_widget):
+        """
+        Add the tabs to the menus and return the created tabs. The tabs that
+        are not eager are not created until they are shown, see
+        _get_tab_toolbox()
+        """
+        self._tab_toolbox_actions = {}
 
+        for descriptor in cfclient.ui.tabs.available:
             # Add to tabs menu
-            tab_action_item = QAction(tab_toolbox.get_tab_toolbox_name())
+            tab_action_item = QAction(descriptor.name)
             tab_action_item.setCheckable(True)
             tab_action_item.triggered.connect(self.toggle_tab_visibility)
-            tab_action_item.tab_toolbox = tab_toolbox
-            tab_toolbox.tab_action_item = tab_action_item
+            tab_action_item.tab_descriptor = descriptor
 
             tabs_menu_item.addAction(tab_action_item)
 
             # Add to toolbox menu
-            toolbox_action_item = QAction(tab_toolbox.get_tab_toolbox_name())
+            toolbox_action_item = QAction(descriptor.name)
             toolbox_action_item.setCheckable(True)
             toolbox_action_item.triggered.connect(self.toggle_toolbox_visibility)
-            toolbox_action_item.tab_toolbox = tab_toolbox
-            tab_toolbox.toolbox_action_item = toolbox_action_item
-            tab_toolbox.dock_widget.closed.connect(lambda: self.toggle_toolbox_visibility(False))
-            tab_toolbox.dock_widget.dockLocationChanged.connect(lambda area: self.set_preferred_dock_area(area))
+            toolbox_action_item.tab_descriptor = descriptor
 
             toolboxes_menu_item.addAction(toolbox_action_item)
 
-        return loaded_tab_toolboxes
+            self._tab_toolbox_actions[descriptor.name] = (tab_action_item,
+                                                          toolbox_action_item)
+
+        return {}
+
+    def _get_tab_toolbox(self, descriptor):
+        """Get a tab, creating it the first time it is used"""
+        if descriptor.name in self.loaded_tab_toolboxes:
+            return self.loaded_tab_toolboxes[descriptor.name]
+
+        callers = self._tab_toolbox_callers()
+        added = [list(caller.callbacks) for caller, _ in callers]
+        param_callbacks = self._param_update_callbacks()
+
+        tab_toolbox = descriptor.create(cfclient.ui.pluginhelper)
+        self.loaded_tab_toolboxes[descriptor.name] = tab_toolbox
+
+        # Set reference for plot-tab.
+        if descriptor.class_name == 'PlotTab':
+            cfclient.ui.pluginhelper.plotTab = tab_toolbox
+
+        (tab_toolbox.tab_action_item,
+         tab_toolbox.toolbox_action_item) = self._tab_toolbox_actions[descriptor.name]
+        tab_toolbox.dock_widget.closed.connect(lambda: self._tab_toolbox_hide(tab_toolbox))
+        tab_toolbox.dock_widget.dockLocationChanged.connect(lambda area: self.set_preferred_dock_area(area))
+
+        # Tell the new tab about what already happened on the link, as if
+        # it had been created at startup. Like when connecting, the parameter
+        # values are updated after connected.
+        for (caller, calls), before in zip(callers, added):
+            for callback in [cb for cb in caller.callbacks if cb not in before]:
+                for args in calls:
+                    callback(*args)
+            if caller is self.cf.connected:
+                self._send_param_values(param_callbacks)
+
+        return tab_toolbox
+
+    def _tab_toolbox_callers(self):
+        """
+        The Crazyflie callbacks a tab can register to when it is created,
+        with the arguments of the calls already made
+        """
+        uri = self.cf.link_uri
+        connected = self.cf.is_connected()
+        params_updated = connected and self.cf.param.is_updated
+        return [
+            (self.cf.link_established, [(uri,)] if connected else []),
+            (self.cf.connected, [(uri,)] if connected else []),
+            (self.cf.fully_connected, [(uri,)] if params_updated else []),
+            (self.cf.param.all_updated, [()] if params_updated else []),
+            (self.cf.log.block_added_cb,
+             [(block,) for block in self.cf.log.log_blocks]),
+            (self.cf.console.receivedChar,
+             [(text,) for text in self._console_text()]),
+        ]
+
+    def _param_update_callbacks(self):
+        """
+        The parameter update callbacks, as (group, name, callback) where group
+        and name are None for the callbacks of a whole group or of all the
+        parameters
+        """
+        param = self.cf.param
+        callbacks = []
+        for complete_name, caller in param.param_update_callbacks.items():
+            group, name = complete_name.split('.', 1)
+            callbacks += [(group, name, cb) for cb in caller.callbacks]
+        for group, caller in param.group_update_callbacks.items():
+            callbacks += [(group, None, cb) for cb in caller.callbacks]
+        callbacks += [(None, None, cb)
+                      for cb in param.all_update_callback.callbacks]
+        return callbacks
+
+    def _send_param_values(self, before):
+        """
+        Call the parameter update callbacks added since before with the
+        current values, since cflib only calls them when a value is updated.
+        Callbacks added by these calls get the values too.
+        """
+        if not (self.cf.is_connected() and self.cf.param.is_updated):
+            return
+        values = self.cf.param.values
+        sent = list(before)
+        new = [c for c in self._param_update_callbacks() if c not in sent]
+        while new:
+            sent += new
+            for group, name, callback in new:
+                for g in ([group] if group else list(values)):
+                    names = [name] if name else list(values.get(g, {}))
+                    for n in [n for n in names if n in values.get(g, {})]:
+                        callback("{}.{}".format(g, n), values[g][n])
+            new = [c for c in self._param_update_callbacks() if c not in sent]
+
+    def _console_received(self, text):
+        with self._console_history_lock:
+            self._console_history.append(text)
+
+    def _console_text(self):
+        with self._console_history_lock:
+            return list(self._console_history)
+
+    def _start_background_init(self):
+        """
+        Do the initialization that can wait until the window is shown, the
+        slow parts in a background thread
+        """
+        self._background_init_start = time.perf_counter()
+        self._scan(self._connectivity_manager.get_address())
+
+        self._startup.add_step("Loading input maps",
+                               self.joystickReader.load_input_maps,
+                               lambda _: self.joystickReader.start_device_discovery())
+        self._startup.add_step("Loading log configurations",
+                               self.logConfigReader.read_configs)
+        self._startup.progress.connect(self._startup_progress_updated)
+        self._startup.start()
+
+    def _startup_progress_updated(self, description, done, total):
+        if done < total:
+            self._startup_progress.setRange(0, total)
+            self._startup_progress.setValue(done)
+            self._startup_progress.setFormat(description + "...")
+            self._startup_progress.show()
+        else:
+            self._startup_progress.hide()
+            logger.info("Startup: background initialization done in %.0f ms",
+                        (time.perf_counter() - self._background_init_start) * 1000)
+
+    def _report_startup_times(self):
+        for name, import_time, create_time in cfclient.ui.tabs.load_times():
+            logger.info("Startup: tab %s, import %.0f ms, create %.0f ms",
+                        name, import_time * 1000, create_time * 1000)
+        logger.info("Startup: main window created in %.0f ms",
+                    self._startup_time * 1000)
+
+    def read_tab_toolbox_config(self):
+        descriptors = {tab.name: tab for tab in cfclient.ui.tabs.available}
 
-    def read_tab_toolbox_config(self, loaded_tab_toolboxes):
         # Add tabs in the correct order
         for name in TabToolbox.read_open_tab_config():
-            if name in loaded_tab_toolboxes.keys():
-                self._tab_toolbox_show_as_tab(loaded_tab_toolboxes[name])
+            if name in descriptors:
+                self._tab_toolbox_show_as_tab(self._get_tab_toolbox(descriptors[name]))
 
         for name in TabToolbox.read_open_toolbox_config():
-            if name in loaded_tab_toolboxes.keys():
-                self._tab_toolbox_show_as_toolbox(loaded_tab_toolboxes[name])
+            if name in descriptors:
+                self._tab_toolbox_show_as_toolbox(self._get_tab_toolbox(descriptors[name]))
 
     def _set_address(self):
         address = 0xE7E7E7E7E7
@@ -487,7 +648,7 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
     @pyqtSlot(bool)
     def toggle_tab_visibility(self, checked):
         tab_action_item = self.sender()
-        tab_toolbox = tab_action_item.tab_toolbox
+        tab_toolbox = self._get_tab_toolbox(tab_action_item.tab_descriptor)
 
         if checked:
             self._tab_toolbox_show_as_tab(tab_toolbox)
@@ -497,7 +658,7 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
     @pyqtSlot(bool)
     def toggle_toolbox_visibility(self, checked):
         toolbox_action_item = self.sender()
-        tab_toolbox = toolbox_action_item.tab_toolbox
+        tab_toolbox = self._get_tab_toolbox(toolbox_action_item.tab_descriptor)
 
         if checked:
             self._tab_toolbox_show_as_toolbox(tab_toolbox)
@@ -646,6 +807,7 @@ class MainUI(QtWidgets.QMainWindow, main_window_class):
         self._update_ui_state()
 
     def closeEvent(self, event):
+        self._startup.wait()
         Config().save_file()
         self.cf.close_link()
         self.hide()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2024 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License along with
+#  this program; if not, write to the Free Software Foundation, Inc., 51
+#  Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Initialization done in the background once the main window is shown, like
+loading the input maps and the log configurations, so the window does not
+have to wait for the disk or for USB devices.
+"""
+
+import logging
+import time
+
+from PyQt6.QtCore import pyqtSignal, QThread
+
+__author__ = 'Bitcraze AB'
+__all__ = ['StartupPipeline']
+
+logger = logging.getLogger(__name__)
+
+
+class StartupPipeline(QThread):
+    """
+    Run a list of steps, in order, in a background thread. Each step is a
+    function run in the thread and an optional function called with its
+    result in the UI thread once it is done.
+    """
+
+    # Description of the step being run, number of steps done and in total
+    progress = pyqtSignal(str, int, int)
+    # All the steps are done
+    done = pyqtSignal()
+
+    _step_done_signal = pyqtSignal(object, object)
+
+    def __init__(self):
+        super(StartupPipeline, self).__init__()
+        self._steps = []
+        self._step_done_signal.connect(self._step_done)
+
+    def add_step(self, description, run, done=None):
+        """Add a step, can only be done before the pipeline is started"""
+        self._steps.append((description, run, done))
+
+    def run(self):
+        total = len(self._steps)
+        for i, (description, run, done) in enumerate(self._steps):
+            self.progress.emit(description, i, total)
+            start = time.perf_counter()
+            try:
+                result = run()
+            except Exception:
+                logger.exception("Startup step failed: %s", description)
+                continue
+            logger.info("Startup: %s in %.0f ms", description,
+                        (time.perf_counter() - start) * 1000)
+            if done is not None:
+                self._step_done_signal.emit(done, result)
+        self.progress.emit("", total, total)
+        self.done.emit()
+
+    def _step_done(self, done, result):
+        done(result)
@@ -31,20 +31,20 @@ The console tab is used as a console for printouts from the Crazyflie.
 
 import logging
 
-from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtGui import QTextCursor
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['ConsoleTab']
 
 logger = logging.getLogger(__name__)
 
-console_tab_class = uic.loadUiType(cfclient.module_path +
-                                   "/ui/tabs/consoleTab.ui")[0]
+console_tab_class = load_ui_type(cfclient.module_path +
+                                 "/ui/tabs/consoleTab.ui")[0]
 
 
 class ConsoleTab(TabToolbox, console_tab_class):
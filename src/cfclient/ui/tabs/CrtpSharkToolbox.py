@@ -26,93 +26,256 @@
 """
 Toolbox for showing packets that is sent via the communication link when
 debugging.
+
+The packets are stored raw in a fixed size ring buffer and only formatted
+when a row is shown. Packets are received in the communication link thread
+and added to the list in batches once per UI frame.
 """
 import os
 from time import time
 from binascii import hexlify
+from collections import deque
 
-from PyQt6 import QtWidgets
-from PyQt6 import uic
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QTimer
+from PyQt6.QtCore import QVariant
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtCore import pyqtSlot
 from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QHeaderView
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['CrtpSharkToolbox']
 
-param_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/crtpSharkToolbox.ui")[0]
+param_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/crtpSharkToolbox.ui")[0]
+
+# Number of packets kept, the oldest ones are dropped when it is full
+PACKET_BUFFER_SIZE = 100000
+
+# How often (in ms) the received packets are added to the list, about
+# once per frame
+UPDATE_PERIOD = 33
+
+# Link keep-alive packets, these are never shown
+NULL_PORT = 15
+NULL_CHANNEL = 3
+
+
+def _parse_filter(text):
+    """
+    Parse a filter like "0 2/1 5" into the ports and the (port, channel)
+    pairs to show, None if everything should be shown. Invalid entries are
+    ignored.
+    """
+    ports = set()
+    channels = set()
+    for item in text.replace(",", " ").split():
+        try:
+            if "/" in item:
+                port, channel = item.split("/", 1)
+                channels.add((int(port), int(channel)))
+            else:
+                ports.add(int(item))
+        except ValueError:
+            pass
+    if not ports and not channels:
+        return None
+    return frozenset(ports), frozenset(channels)
+
+
+class PacketModel(QAbstractTableModel):
+    """Model of the captured packets, stored in a ring buffer"""
+
+    HEADERS = ['ms', 'Direction', 'Port/Chan', 'Data']
+
+    def __init__(self, capacity=PACKET_BUFFER_SIZE, parent=None):
+        super(PacketModel, self).__init__(parent)
+        self._capacity = capacity
+        self._packets = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self.dropped = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._count
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, col, orientation, role=None):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return QVariant(self.HEADERS[col])
+        return QVariant()
+
+    def data(self, index, role=None):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return QVariant()
+        packet = self._packets[(self._start + index.row()) % self._capacity]
+        return QVariant(self._format(packet)[index.column()])
+
+    @staticmethod
+    def _format(packet):
+        ms, direction, port, channel, data = packet
+        return ("%d" % ms, direction, "%d/%d" % (port, channel),
+                hexlify(data).decode('utf8'))
+
+    def add(self, packets):
+        """Add a list of packets at the end, dropping the oldest if full"""
+        if not packets:
+            return
+        if len(packets) >= self._capacity:
+            self.beginResetModel()
+            self.dropped += self._count + len(packets) - self._capacity
+            self._packets = list(packets[-self._capacity:])
+            self._start = 0
+            self._count = self._capacity
+            self.endResetModel()
+            return
+
+        overflow = self._count + len(packets) - self._capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self._start = (self._start + overflow) % self._capacity
+            self._count -= overflow
+            self.dropped += overflow
+            self.endRemoveRows()
+
+        self.beginInsertRows(QModelIndex(), self._count,
+                             self._count + len(packets) - 1)
+        for packet in packets:
+            self._packets[(self._start + self._count) % self._capacity] = packet
+            self._count += 1
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._packets = [None] * self._capacity
+        self._start = 0
+        self._count = 0
+        self.dropped = 0
+        self.endResetModel()
+
+    def lines(self):
+        """The packets, oldest first, formatted as CSV lines"""
+        for i in range(self._count):
+            packet = self._packets[(self._start + i) % self._capacity]
+            yield ", ".join(self._format(packet))
 
 
 class CrtpSharkToolbox(TabToolbox, param_tab_class):
     """Show packets that is sent vie the communication link"""
     nameModified = pyqtSignal()
-    _incoming_packet_signal = pyqtSignal(object)
-    _outgoing_packet_signal = pyqtSignal(object)
 
     def __init__(self, helper):
         super(CrtpSharkToolbox, self).__init__(helper, 'Crtp sniffer')
         self.setupUi(self)
 
-        # Init the tree widget
-        self.logTree.setHeaderLabels(['ms', 'Direction', 'Port/Chan', 'Data'])
+        self._model = PacketModel(parent=self)
+        self.logTable.setModel(self._model)
+        # Fixed row heights so the view does not have to measure the rows
+        rows = self.logTable.verticalHeader()
+        rows.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        rows.setDefaultSectionSize(self.fontMetrics().height() + 4)
 
         # Connect GUI signals
         self.clearButton.clicked.connect(self.clearLog)
         self.saveButton.clicked.connect(self._save_data)
-
-        self._incoming_packet_signal.connect(lambda p: self._packet("IN", p))
-        self._outgoing_packet_signal.connect(lambda p: self._packet("OUT", p))
+        self.masterCheck.toggled.connect(self._set_capturing)
+        self.filterEdit.textChanged.connect(self._set_filter)
         self._ms_offset = int(round(time() * 1000))
 
-        self._data = []
+        # Written by the link thread, these are only replaced, never modified
+        self._capturing = self.masterCheck.isChecked()
+        self._filter = None
+
+        # Packets received since the last update of the list
+        self._received = deque(maxlen=PACKET_BUFFER_SIZE)
+        # Packets pushed out of _received before the list was updated
+        self._dropped = 0
+
+        self._update_timer = QTimer(self)
+        self._update_timer.setInterval(UPDATE_PERIOD)
+        self._update_timer.timeout.connect(self._update_list)
 
     def _packet(self, dir, pk):
-        if self.masterCheck.isChecked() and \
-           not (pk.port == 15 and pk.channel == 3):
-            line = QtWidgets.QTreeWidgetItem()
+        if not self._capturing:
+            return
+        port = pk.port
+        channel = pk.channel
+        if port == NULL_PORT and channel == NULL_CHANNEL:
+            return
+        packet_filter = self._filter
+        if packet_filter is not None:
+            ports, channels = packet_filter
+            if port not in ports and (port, channel) not in channels:
+                return
+        ms_diff = int(round(time() * 1000)) - self._ms_offset
+        if len(self._received) == self._received.maxlen:
+            self._dropped += 1
+        self._received.append((ms_diff, dir, port, channel, bytes(pk.data)))
+
+    def _update_list(self):
+        packets = []
+        while self._received:
+            packets.append(self._received.popleft())
+        if not packets:
+            return
 
-            ms_diff = int(round(time() * 1000)) - self._ms_offset
-            line.setData(0, Qt.ItemDataRole.DisplayRole, "%d" % ms_diff)
-            line.setData(1, Qt.ItemDataRole.DisplayRole, "%s" % dir)
-            line.setData(2, Qt.ItemDataRole.DisplayRole, "%d/%d" % (pk.port, pk.channel))
+        scrollbar = self.logTable.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        self._model.add(packets)
+        if follow:
+            self.logTable.scrollToBottom()
+        self._update_count()
 
-            line.setData(3, Qt.ItemDataRole.DisplayRole, hexlify(pk.data).decode('utf8'))
+    def _update_count(self):
+        text = "%d packets" % self._model.rowCount()
+        dropped = self._model.dropped + self._dropped
+        if dropped:
+            text += ", %d dropped" % dropped
+        self.countLabel.setText(text)
 
-            s = "%d, %s, %d/%d, %s" % (ms_diff, dir, pk.port, pk.channel,
-                                       hexlify(pk.data).decode('utf8'))
-            self._data.append(s)
+    def _set_capturing(self, checked):
+        self._capturing = checked
 
-            self.logTree.addTopLevelItem(line)
-            self.logTree.scrollToItem(line)
+    def _set_filter(self, text):
+        self._filter = _parse_filter(text)
 
     @pyqtSlot()
     def clearLog(self):
-        self.logTree.clear()
-        self._data = []
+        self._received.clear()
+        self._dropped = 0
+        self._model.clear()
+        self.countLabel.setText("")
 
     def _incoming_packet(self, pk):
-        self._incoming_packet_signal.emit(pk)
+        self._packet("IN", pk)
 
     def _outgoing_packet(self, pk):
-        self._outgoing_packet_signal.emit(pk)
+        self._packet("OUT", pk)
 
     def enable(self):
         self._helper.cf.packet_received.add_callback(self._incoming_packet)
         self._helper.cf.packet_sent.add_callback(self._outgoing_packet)
+        self._update_timer.start()
 
     def disable(self):
         self._helper.cf.packet_received.remove_callback(self._incoming_packet)
         self._helper.cf.packet_sent.remove_callback(self._outgoing_packet)
+        self._update_timer.stop()
+        self._update_list()
 
     def _save_data(self):
+        self._update_list()
         dir = os.path.join(cfclient.config_path, "logdata")
         fname = os.path.join(dir, "shark_data.csv")
         if not os.path.exists(dir):
             os.makedirs(dir)
-        f = open(fname, 'w')
-        for s in self._data:
-            f.write("%s\n" % s)
-        f.close()
+        with open(fname, 'w') as f:
+            for s in self._model.lines():
+                f.write("%s\n" % s)
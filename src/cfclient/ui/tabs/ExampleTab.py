@@ -34,19 +34,19 @@ connects the connected/disconnected callbacks.
 
 import logging
 
-from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QMessageBox
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['ExampleTab']
 
 logger = logging.getLogger(__name__)
 
-example_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/exampleTab.ui")[0]
+example_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/exampleTab.ui")[0]
 
 
 class ExampleTab(TabToolbox, example_tab_class):
@@ -32,8 +32,7 @@ The flight control tab shows telemetry data and flight settings.
 import logging
 from enum import Enum
 
-from PyQt6 import uic
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtWidgets import QMessageBox
 
 import cfclient
@@ -45,14 +44,15 @@ from cfclient.utils.config import Config
 from cfclient.utils.input import JoystickReader
 
 from cfclient.ui.tab_toolbox import TabToolbox
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['FlightTab']
 
 logger = logging.getLogger(__name__)
 
-flight_tab_class = uic.loadUiType(cfclient.module_path +
-                                  "/ui/tabs/flightTab.ui")[0]
+flight_tab_class = load_ui_type(cfclient.module_path +
+                                "/ui/tabs/flightTab.ui")[0]
 
 MAX_THRUST = 65536.0
 
@@ -90,9 +90,6 @@ class CommanderAction(Enum):
 class FlightTab(TabToolbox, flight_tab_class):
     uiSetupReadySignal = pyqtSignal()
 
-    _log_data_signal = pyqtSignal(int, object, object)
-    _pose_data_signal = pyqtSignal(object, object)
-
     _input_updated_signal = pyqtSignal(float, float, float, float)
     _rp_trim_updated_signal = pyqtSignal(float, float)
     _emergency_stop_updated_signal = pyqtSignal(bool)
@@ -103,7 +100,8 @@ class FlightTab(TabToolbox, flight_tab_class):
 
     _log_error_signal = pyqtSignal(object, str)
 
-    # UI_DATA_UPDATE_FPS = 10
+    # Used if the refresh rate of the screen is not known
+    DEFAULT_REFRESH_RATE = 60
 
     connectionFinishedSignal = pyqtSignal(str)
     disconnectedSignal = pyqtSignal(str)
@@ -156,8 +154,17 @@ class FlightTab(TabToolbox, flight_tab_class):
         self._assisted_control_updated_signal.connect(
             self._assisted_control_updated)
 
-        self._pose_data_signal.connect(self._pose_data_received)
-        self._log_data_signal.connect(self._log_data_received)
+        # The latest log and pose data, written by the link thread and
+        # shown once per screen refresh by _update_telemetry()
+        self._latest_log_data = None
+        self._latest_pose = None
+        self._shown_log_data = None
+        self._shown_pose = None
+        # The values shown in the widgets, to only update changed ones
+        self._shown = {}
+        self._shown_supervisor_info = None
+        self._telemetry_timer = QTimer(self)
+        self._telemetry_timer.timeout.connect(self._update_telemetry)
 
         self._log_error_signal.connect(self._logging_error)
 
@@ -228,7 +235,7 @@ class FlightTab(TabToolbox, flight_tab_class):
         self._helper.inputDeviceReader.limiting_updated.add_callback(self._limiting_updated.emit)
         self._limiting_updated.connect(self._set_limiting_enabled)
 
-        self._helper.pose_logger.data_received_cb.add_callback(self._pose_data_signal.emit)
+        self._helper.pose_logger.data_received_cb.add_callback(self._pose_data_stored)
 
     def _set_limiting_enabled(self, rp_limiting_enabled, yaw_limiting_enabled, thrust_limiting_enabled):
 
@@ -284,40 +291,80 @@ class FlightTab(TabToolbox, flight_tab_class):
                           "Error when starting log config [%s]: %s" % (
                               log_conf.name, msg))
 
-    def _log_data_received(self, timestamp, data, logconf):
-        if self.isVisible() and self._isConnected:
-            self.actualM1.setValue(data[self.LOG_NAME_MOTOR_1])
-            self.actualM2.setValue(data[self.LOG_NAME_MOTOR_2])
-            self.actualM3.setValue(data[self.LOG_NAME_MOTOR_3])
-            self.actualM4.setValue(data[self.LOG_NAME_MOTOR_4])
+    def _log_data_stored(self, timestamp, data, logconf):
+        """Called from the link thread, the data is shown at the next refresh"""
+        self._latest_log_data = data
+
+    def _pose_data_stored(self, pose_logger, pose):
+        """Called from the link thread, the pose is shown at the next refresh"""
+        self._latest_pose = pose
+
+    def enable(self):
+        refresh_rate = self.screen().refreshRate() or self.DEFAULT_REFRESH_RATE
+        self._telemetry_timer.start(int(1000 / refresh_rate))
 
-            self.estimateThrust.setText(
-                "%.2f%%" % self.thrustToPercentage(data[self.LOG_NAME_THRUST]))
+    def disable(self):
+        self._telemetry_timer.stop()
 
-            if data[self.LOG_NAME_CAN_FLY] != self._can_fly_deprecated:
-                self._can_fly_deprecated = data[self.LOG_NAME_CAN_FLY]
-                self._update_flight_commander(True)
+    def _set_text(self, label, text):
+        if self._shown.get(label) != text:
+            self._shown[label] = text
+            label.setText(text)
 
-            if self.LOG_NAME_SUPERVISOR_INFO in data:
-                self._supervisor_info_bitfield = data[self.LOG_NAME_SUPERVISOR_INFO]
+    def _set_value(self, bar, value):
+        if self._shown.get(bar) != value:
+            self._shown[bar] = value
+            bar.setValue(value)
+
+    def _update_telemetry(self):
+        if not self.isVisible():
+            return
 
+        data = self._latest_log_data
+        if self._isConnected and data is not None and data is not self._shown_log_data:
+            self._shown_log_data = data
+            self._log_data_received(data)
+
+        pose = self._latest_pose
+        if pose is not None and pose is not self._shown_pose:
+            self._shown_pose = pose
+            self._pose_data_received(pose)
+
+    def _log_data_received(self, data):
+        self._set_value(self.actualM1, data[self.LOG_NAME_MOTOR_1])
+        self._set_value(self.actualM2, data[self.LOG_NAME_MOTOR_2])
+        self._set_value(self.actualM3, data[self.LOG_NAME_MOTOR_3])
+        self._set_value(self.actualM4, data[self.LOG_NAME_MOTOR_4])
+
+        self._set_text(self.estimateThrust,
+                       "%.2f%%" % self.thrustToPercentage(data[self.LOG_NAME_THRUST]))
+
+        if data[self.LOG_NAME_CAN_FLY] != self._can_fly_deprecated:
+            self._can_fly_deprecated = data[self.LOG_NAME_CAN_FLY]
+            self._update_flight_commander(True)
+
+        supervisor_info = data.get(self.LOG_NAME_SUPERVISOR_INFO,
+                                   self._supervisor_info_bitfield)
+        if supervisor_info != self._shown_supervisor_info:
+            self._supervisor_info_bitfield = supervisor_info
+            self._shown_supervisor_info = supervisor_info
             self._update_supervisor_and_arming(True)
 
-    def _pose_data_received(self, pose_logger, pose):
-        if self.isVisible():
-            estimated_z = pose[2]
-            roll = pose[3]
-            pitch = pose[4]
+    def _pose_data_received(self, pose):
+        estimated_z = pose[2]
+        roll = pose[3]
+        pitch = pose[4]
 
-            self.estimateX.setText(("%.2f" % pose[0]))
-            self.estimateY.setText(("%.2f" % pose[1]))
-            self.estimateZ.setText(("%.2f" % estimated_z))
-            self.estimateRoll.setText(("%.2f" % roll))
-            self.estimatePitch.setText(("%.2f" % pitch))
-            self.estimateYaw.setText(("%.2f" % pose[5]))
+        self._set_text(self.estimateX, "%.2f" % pose[0])
+        self._set_text(self.estimateY, "%.2f" % pose[1])
+        self._set_text(self.estimateZ, "%.2f" % estimated_z)
+        self._set_text(self.estimateRoll, "%.2f" % roll)
+        self._set_text(self.estimatePitch, "%.2f" % pitch)
+        self._set_text(self.estimateYaw, "%.2f" % pose[5])
 
-            self.ai.setBaro(estimated_z, self.is_visible())
-            self.ai.setRollPitch(-roll, pitch, self.is_visible())
+        # The indicator is only redrawn once, at the next paint
+        self.ai.setBaro(estimated_z)
+        self.ai.setRollPitch(-roll, pitch)
 
     def _heighthold_input_updated(self, roll, pitch, yaw, height):
         if (self.isVisible() and
@@ -473,7 +520,7 @@ class FlightTab(TabToolbox, flight_tab_class):
 
         try:
             self._helper.cf.log.add_config(lg)
-            lg.data_received_cb.add_callback(self._log_data_signal.emit)
+            lg.data_received_cb.add_callback(self._log_data_stored)
             lg.error_cb.add_callback(self._log_error_signal.emit)
             lg.start()
         except KeyError as e:
@@ -495,6 +542,10 @@ class FlightTab(TabToolbox, flight_tab_class):
 
     def disconnected(self, linkURI):
         self._isConnected = False
+        self._latest_log_data = None
+        self._latest_pose = None
+        self._shown = {}
+        self._shown_supervisor_info = None
         self.ai.setRollPitch(0, 0)
         self.actualM1.setValue(0)
         self.actualM2.setValue(0)
@@ -649,6 +700,8 @@ class FlightTab(TabToolbox, flight_tab_class):
                 self._helper.cf.platform.send_arming_request(False)
             else:
                 if self._can_arm():
+                    # Shown until the next supervisor info is received
+                    self._shown_supervisor_info = None
                     self.armButton.setStyleSheet("background-color: orange")
                     self._helper.cf.platform.send_arming_request(True)
 
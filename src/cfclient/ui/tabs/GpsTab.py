@@ -34,20 +34,20 @@ import cfclient
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QMessageBox
 from cfclient.ui.tab_toolbox import TabToolbox
+from cfclient.utils.uicache import load_ui_type
 from cflib.crazyflie.log import LogConfig
 from PyQt6 import QtCore
 from PyQt6 import QtGui
 from PyQt6 import QtNetwork
 from PyQt6 import QtWebKit
-from PyQt6 import uic
 
 __author__ = 'Bitcraze AB'
 __all__ = ['GpsTab']
 
 logger = logging.getLogger(__name__)
 
-gps_tab_class = uic.loadUiType(cfclient.module_path +
-                               "/ui/tabs/gpsTab.ui")[0]
+gps_tab_class = load_ui_type(cfclient.module_path +
+                             "/ui/tabs/gpsTab.ui")[0]
 
 
 class GpsTab(TabToolbox, gps_tab_class):
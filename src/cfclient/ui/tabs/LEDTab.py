@@ -32,13 +32,14 @@ Basic tab to be able to set (and test) colors in the LED-ring.
 
 import logging
 
-from PyQt6 import QtGui, uic
+from PyQt6 import QtGui
 from PyQt6.QtCore import pyqtSignal
 from PyQt6 import QtWidgets
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
 from cfclient.utils.ui import UiUtils
+from cfclient.utils.uicache import load_ui_type
 
 from cflib.crazyflie.mem import MemoryElement
 
@@ -47,7 +48,7 @@ __all__ = ['LEDTab']
 
 logger = logging.getLogger(__name__)
 
-led_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/ledTab.ui")[0]
+led_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/ledTab.ui")[0]
 
 
 class LEDTab(TabToolbox, led_tab_class):
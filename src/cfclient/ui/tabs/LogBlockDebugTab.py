@@ -30,16 +30,17 @@ Shows all the parameters available in the Crazyflie and also gives the ability
 to edit them.
 """
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 from PyQt6.QtCore import Qt, pyqtSignal
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['LogBlockDebugTab']
 
-logblock_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/logBlockDebugTab.ui")[0]
+logblock_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/logBlockDebugTab.ui")[0]
 
 
 class LogBlockDebugTab(TabToolbox, logblock_tab_class):
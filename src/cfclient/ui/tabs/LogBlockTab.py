@@ -31,8 +31,7 @@ This tab shows all log blocks that are registered and can be used to start the
 logging and also to write the logging data to file.
 """
 
-from PyQt6 import uic
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
@@ -43,12 +42,14 @@ from PyQt6.QtWidgets import QApplication, QStyledItemDelegate
 from PyQt6.QtWidgets import QAbstractItemView, QStyleOptionButton, QStyle
 from PyQt6.QtCore import QAbstractItemModel, QModelIndex
 
+from cfclient.utils.config import Config
 from cfclient.utils.logdatawriter import LogWriter
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['LogBlockTab']
 
-logblock_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/logBlockTab.ui")[0]
+logblock_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/logBlockTab.ui")[0]
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +82,12 @@ class LogBlockItem(object):
         self.id = block.id
         self.period = block.period_in_ms
         self._model = model
-        self._log_file_writer = LogWriter(block, connected_ts)
+        self._log_file_writer = LogWriter(
+            block, connected_ts,
+            file_format=Config().get("log_file_format"),
+            compression=Config().get("log_file_compression"),
+            rotate_size=Config().get("log_file_rotate_size") * 1024 * 1024,
+            rotate_time=Config().get("log_file_rotate_time"))
 
         self._block.started_cb.add_callback(self._set_started)
         self._block.added_cb.add_callback(self._set_added)
@@ -131,6 +137,10 @@ class LogBlockItem(object):
         """Stop logging to file for this block"""
         self._log_file_writer.stop()
 
+    def dropped_samples(self):
+        """Return the number of samples that could not be written to file"""
+        return self._log_file_writer.dropped_samples()
+
     def start(self):
         """Start the logging of this block"""
         self._doing_transaction = True
@@ -168,7 +178,7 @@ class LogBlockModel(QAbstractItemModel):
         super(LogBlockModel, self).__init__(parent)
         self._nodes = []
         self._column_headers = ['Id', 'Name', 'Period (ms)', 'Start',
-                                'Write to file', 'Contents']
+                                'Write to file', 'Dropped', 'Contents']
         self._view = view
         self._nodes_written_to_file = []
 
@@ -181,6 +191,12 @@ class LogBlockModel(QAbstractItemModel):
         """Force a refresh of the view though the model"""
         self.layoutChanged.emit()
 
+    def refresh_writing(self):
+        """Refresh the view if any block is written to file, to update the
+        number of dropped samples"""
+        if any(node.writing_to_file() for node in self._nodes):
+            self.refresh()
+
     def clicked(self, index):
         """
         Callback when a cell has been clicked (mouse down/up on same cell)
@@ -250,9 +266,9 @@ class LogBlockModel(QAbstractItemModel):
         node = index.internalPointer()
         parent = node.parent
         if parent:
-            if role == Qt.ItemDataRole.DisplayRole and index.column() == 5:
+            if role == Qt.ItemDataRole.DisplayRole and index.column() == 6:
                 return node.name
-        elif not parent and role == Qt.ItemDataRole.DisplayRole and index.column() == 5:
+        elif not parent and role == Qt.ItemDataRole.DisplayRole and index.column() == 6:
             return node.var_list()
         elif not parent and role == Qt.ItemDataRole.DisplayRole:
             if index.column() == 0:
@@ -261,6 +277,8 @@ class LogBlockModel(QAbstractItemModel):
                 return node.name
             if index.column() == 2:
                 return str(node.period)
+            if index.column() == 5:
+                return str(node.dropped_samples())
         if role == Qt.ItemDataRole.TextAlignmentRole and \
                 (index.column() == 4 or index.column() == 3):
             return Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter
@@ -340,6 +358,12 @@ class LogBlockTab(TabToolbox, logblock_tab_class):
         self._block_tree.setItemDelegate(CheckboxDelegate())
         self._block_tree.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
 
+        # Update the number of dropped samples while writing to file
+        self._refresh_timer = QTimer()
+        self._refresh_timer.setInterval(1000)
+        self._refresh_timer.timeout.connect(self._model.refresh_writing)
+        self._refresh_timer.start()
+
     def _block_added(self, block):
         """Callback from logging layer when a new block is added"""
         self._model.add_block(block, self._helper.cf.connected_ts)
@@ -31,18 +31,18 @@ Shows information from the Python logging framework
 
 import logging
 
-from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['LogClientTab']
 
 logger = logging.getLogger(__name__)
 
-log_client_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/logClientTab.ui")[0]
+log_client_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/logClientTab.ui")[0]
 
 
 class LogHandler(logging.StreamHandler):
@@ -33,7 +33,7 @@ to edit them.
 import logging
 from threading import Event
 
-from PyQt6 import uic, QtCore
+from PyQt6 import QtCore
 from PyQt6.QtCore import QSortFilterProxyModel, Qt, pyqtSignal
 from PyQt6.QtCore import QAbstractItemModel, QModelIndex, QVariant
 from PyQt6.QtGui import QBrush, QColor
@@ -45,11 +45,12 @@ from cflib.localization import ParamFileManager
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
 from cfclient.utils.logconfigreader import FILE_REGEX_YAML
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['ParamTab']
 
-param_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/paramTab.ui")[0]
+param_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/paramTab.ui")[0]
 
 logger = logging.getLogger(__name__)
 
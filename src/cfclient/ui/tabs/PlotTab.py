@@ -32,7 +32,6 @@ import logging
 
 from cfclient.ui.tab_toolbox import TabToolbox
 from cfclient.ui.widgets.plotwidget import PlotWidget
-from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtCore import QAbstractItemModel
 from PyQt6.QtCore import QModelIndex
@@ -40,13 +39,14 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QMessageBox
 
 import cfclient
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['PlotTab']
 
 logger = logging.getLogger(__name__)
 
-plot_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/plotTab.ui")[0]
+plot_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/plotTab.ui")[0]
 
 
 class LogConfigModel(QAbstractItemModel):
@@ -165,6 +165,12 @@ class PlotTab(TabToolbox, plot_tab_class):
         self._previous_config = None
         self._started_previous = False
 
+    def enable(self):
+        self._plot.start_rendering()
+
+    def disable(self):
+        self._plot.stop_rendering()
+
     def _connected(self, link_uri):
         """Callback when the Crazyflie has been connected"""
         self._plot.removeAllDatasets()
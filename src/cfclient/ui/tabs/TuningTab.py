@@ -27,13 +27,13 @@ Tab for tuning PID controller, mainly for larger quads.
 import logging
 
 from PyQt6 import QtWidgets
-from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal, Qt
 import time
 
 import cfclient
 from cfclient.ui.tab_toolbox import TabToolbox
 from cfclient.ui.widgets.super_slider import SuperSlider
+from cfclient.utils.uicache import load_ui_type
 from cflib.crazyflie import Crazyflie, Param
 from cflib.utils.callbacks import Syncer
 
@@ -42,7 +42,7 @@ __all__ = ['TuningTab']
 
 logger = logging.getLogger(__name__)
 
-tuning_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/tuningTab.ui")[0]
+tuning_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/tuningTab.ui")[0]
 
 
 class SliderParamMapper:
@@ -26,40 +26,74 @@
 """
 Find all the available tabs so they can be loaded.
 
-Dropping a new .py file into this directory will automatically list and load
-it into the UI when it is started.
+The tabs are listed by name only, a tab module is imported (and its .ui file
+compiled) when the tab is first shown. Tabs that must be running even when not
+shown, like the flight tab that handles the emergency stop from the input
+device, are eager and created at startup. To add a new tab, drop its .py file
+into this directory and add it to the available list.
 """
-from .ConsoleTab import ConsoleTab
-from .CrtpSharkToolbox import CrtpSharkToolbox
-# from .ExampleTab import ExampleTab
-from .FlightTab import FlightTab
-# from .GpsTab import GpsTab
-from .LEDTab import LEDTab
-from .LogBlockTab import LogBlockTab
-from .LogTab import LogTab
-from .ParamTab import ParamTab
-from .PlotTab import PlotTab
-from .locopositioning_tab import LocoPositioningTab
-from .LogClientTab import LogClientTab
-from .lighthouse_tab import LighthouseTab
-from .TuningTab import TuningTab
+import importlib
+import logging
+import time
 
 __author__ = 'Bitcraze AB'
-__all__ = []
+__all__ = ['TabDescriptor', 'available', 'load_times']
+
+logger = logging.getLogger(__name__)
+
+
+class TabDescriptor:
+    """Describes a tab so it can be listed without importing it"""
+
+    def __init__(self, name, module, class_name, eager=False):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        # Create the tab at startup instead of when it is first shown
+        self.eager = eager
+        self.import_time = None
+        self.create_time = None
+
+    def create(self, helper):
+        """Import the tab module and create the tab"""
+        start = time.perf_counter()
+        module = importlib.import_module("." + self.module, __name__)
+        self.import_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tab_toolbox = getattr(module, self.class_name)(helper)
+        self.create_time = time.perf_counter() - start
+
+        logger.debug("Loaded tab %s, import %.0f ms, create %.0f ms",
+                     self.name, self.import_time * 1000,
+                     self.create_time * 1000)
+        return tab_toolbox
+
 
 available = [
-    ConsoleTab,
-    # ExampleTab,
-    FlightTab,
-    # GpsTab,
-    LEDTab,
-    LogBlockTab,
-    LogTab,
-    ParamTab,
-    PlotTab,
-    LocoPositioningTab,
-    LighthouseTab,
-    LogClientTab,
-    TuningTab,
-    CrtpSharkToolbox,
+    TabDescriptor('Console', 'ConsoleTab', 'ConsoleTab'),
+    # TabDescriptor('Example', 'ExampleTab', 'ExampleTab'),
+    TabDescriptor('Flight Control', 'FlightTab', 'FlightTab', eager=True),
+    # TabDescriptor('GPS', 'GpsTab', 'GpsTab'),
+    TabDescriptor('LED', 'LEDTab', 'LEDTab'),
+    TabDescriptor('Log Blocks', 'LogBlockTab', 'LogBlockTab', eager=True),
+    TabDescriptor('Log TOC', 'LogTab', 'LogTab'),
+    TabDescriptor('Parameters', 'ParamTab', 'ParamTab'),
+    TabDescriptor('Plotter', 'PlotTab', 'PlotTab'),
+    TabDescriptor('Loco Positioning', 'locopositioning_tab',
+                  'LocoPositioningTab'),
+    TabDescriptor('Lighthouse Positioning', 'lighthouse_tab',
+                  'LighthouseTab'),
+    TabDescriptor('Log Client', 'LogClientTab', 'LogClientTab', eager=True),
+    TabDescriptor('Tuning', 'TuningTab', 'TuningTab'),
+    TabDescriptor('Crtp sniffer', 'CrtpSharkToolbox', 'CrtpSharkToolbox'),
 ]
+
+
+def load_times():
+    """
+    Get the time (in s) it took to import and to create each of the loaded
+    tabs, as a list of (name, import time, create time)
+    """
+    return [(tab.name, tab.import_time, tab.create_time)
+            for tab in available if tab.create_time is not None]
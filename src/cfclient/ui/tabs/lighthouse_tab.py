@@ -32,7 +32,6 @@ Shows data for the Lighthouse Positioning system
 
 import logging
 
-from PyQt6 import uic
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtWidgets import QMessageBox
 from PyQt6.QtWidgets import QFileDialog
@@ -50,6 +49,7 @@ from cfclient.ui.dialogs.lighthouse_bs_geometry_dialog import LighthouseBsGeomet
 from cfclient.ui.dialogs.basestation_mode_dialog import LighthouseBsModeDialog
 from cfclient.ui.dialogs.lighthouse_system_type_dialog import LighthouseSystemTypeDialog
 from cfclient.utils.logconfigreader import FILE_REGEX_YAML
+from cfclient.utils.uicache import load_ui_type
 
 from vispy import scene
 import numpy as np
@@ -61,7 +61,7 @@ __all__ = ['LighthouseTab']
 
 logger = logging.getLogger(__name__)
 
-lighthouse_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/lighthouse_tab.ui")[0]
+lighthouse_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/lighthouse_tab.ui")[0]
 
 STYLE_RED_BACKGROUND = "background-color: lightpink;"
 STYLE_GREEN_BACKGROUND = "background-color: lightgreen;"
@@ -35,7 +35,6 @@ from enum import Enum
 from collections import namedtuple
 
 import time
-from PyQt6 import uic
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtWidgets import QMessageBox
 from PyQt6.QtWidgets import QLabel
@@ -48,6 +47,7 @@ from cflib.crazyflie.mem import MemoryElement
 from lpslib.lopoanchor import LoPoAnchor
 
 from cfclient.ui.dialogs.anchor_position_dialog import AnchorPositionDialog
+from cfclient.utils.uicache import load_ui_type
 
 from vispy import scene
 import numpy as np
@@ -59,7 +59,7 @@ __all__ = ['LocoPositioningTab']
 
 logger = logging.getLogger(__name__)
 
-locopositioning_tab_class = uic.loadUiType(cfclient.module_path + "/ui/tabs/locopositioning_tab.ui")[0]
+locopositioning_tab_class = load_ui_type(cfclient.module_path + "/ui/tabs/locopositioning_tab.ui")[0]
 
 STYLE_RED_BACKGROUND = "background-color: lightpink;"
 STYLE_GREEN_BACKGROUND = "background-color: lightgreen;"
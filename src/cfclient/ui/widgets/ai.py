@@ -29,6 +29,7 @@
 Attitude indicator widget.
 """
 
+import math
 import sys
 
 from PyQt6 import QtGui
@@ -51,35 +52,47 @@ class AttitudeIndicator(QtWidgets.QWidget):
         self.hoverHeight = 0.0
         self.hoverTargetHeight = 0.0
 
+        # Drawing the rotated pitch ladder is slow, so it is drawn in a
+        # pixmap that is then painted with the roll and pitch transform. The
+        # pixmap holds the part of the ladder around the current pitch, and
+        # is only drawn again when the pitch moves out of it or the widget
+        # is resized.
+        self._ladder = None
+        self._ladder_key = None
+        self._ladder_top = 0
+
         self.setMinimumSize(30, 30)
         # self.setMaximumSize(240,240)
 
+    # The setters schedule a redraw with update(), so several changes made
+    # before the next paint only draw the widget once
+
     def setRoll(self, roll, repaint=True):
         self.roll = roll
         if repaint:
-            self.repaint()
+            self.update()
 
     def setPitch(self, pitch, repaint=True):
         self.pitch = pitch
         if repaint:
-            self.repaint()
+            self.update()
 
     def setHover(self, target, repaint=True):
         self.hoverTargetHeight = target
         self.hover = target > 0
         if repaint:
-            self.repaint()
+            self.update()
 
     def setBaro(self, height, repaint=True):
         self.hoverHeight = height
         if repaint:
-            self.repaint()
+            self.update()
 
     def setRollPitch(self, roll, pitch, repaint=True):
         self.roll = roll
         self.pitch = pitch
         if repaint:
-            self.repaint()
+            self.update()
 
     def paintEvent(self, e):
         qp = QtGui.QPainter()
@@ -87,30 +100,42 @@ class AttitudeIndicator(QtWidgets.QWidget):
         self.drawWidget(qp)
         qp.end()
 
-    def drawWidget(self, qp):
-        size = self.size()
-        w = size.width()
-        h = size.height()
-
-        qp.translate(w / 2, h / 2)
-        qp.rotate(self.roll)
-        qp.translate(0, (self.pitch * h) / 50)
-        qp.translate(-w / 2, -h / 2)
-        qp.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
-
+    def _ladder_layer(self, w, h):
+        """
+        Get the pixmap with the horizon line and the pitch ladder around the
+        current pitch, and the position of its top left corner
+        """
+        # The ladder has to cover the diagonal of the widget, whatever the
+        # roll is, and some margin so it is not drawn again for each frame
+        radius = int(math.hypot(w, h) / 2) + 1
+        margin = int(h / 2)
+        center = int(h / 2 - (self.pitch * h) / 50)
+        ratio = self.devicePixelRatioF()
+
+        if (self._ladder_key != (w, h, ratio) or
+                abs(center - (self._ladder_top + radius + margin)) > margin):
+            self._ladder_key = (w, h, ratio)
+            self._ladder_top = center - radius - margin
+            height = 2 * (radius + margin)
+
+            self._ladder = QtGui.QPixmap(int(2 * radius * ratio),
+                                         int(height * ratio))
+            self._ladder.setDevicePixelRatio(ratio)
+            self._ladder.fill(Qt.GlobalColor.transparent)
+            qp = QtGui.QPainter(self._ladder)
+            qp.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+            qp.translate(radius - int(w / 2), -self._ladder_top)
+            # Include the text of the lines just outside the pixmap
+            self._draw_ladder(qp, w, h, self._ladder_top - 10,
+                              self._ladder_top + height + 10)
+            qp.end()
+
+        return int(w / 2) - radius, self._ladder_top, self._ladder
+
+    def _draw_ladder(self, qp, w, h, top, bottom):
         font = QtGui.QFont('Serif', 7, QtGui.QFont.Weight.Light)
         qp.setFont(font)
 
-        # Draw the blue
-        qp.setPen(QtGui.QColor(0, 61, 144))
-        qp.setBrush(QtGui.QColor(0, 61, 144))
-        qp.drawRect(-w, int(h / 2), 3 * w, -3 * h)
-
-        # Draw the marron
-        qp.setPen(QtGui.QColor(59, 41, 39))
-        qp.setBrush(QtGui.QColor(59, 41, 39))
-        qp.drawRect(-w, int(h / 2), 3 * w, 3 * h)
-
         pen = QtGui.QPen(QtGui.QColor(255, 255, 255), 1.5, Qt.PenStyle.SolidLine)
         qp.setPen(pen)
         qp.drawLine(-w, int(h / 2), 3 * w, int(h / 2))
@@ -119,6 +144,8 @@ class AttitudeIndicator(QtWidgets.QWidget):
         for ofset in [-180, 0, 180]:
             for i in range(-900, 900, 25):
                 pos = int((((i / 10.0) + 25 + ofset) * h / 50.0))
+                if pos < top or pos > bottom:
+                    continue
                 if i % 100 == 0:
                     length = 0.35 * w
                     if i != 0:
@@ -140,6 +167,31 @@ class AttitudeIndicator(QtWidgets.QWidget):
                 qp.drawLine(int((w / 2) - (length / 2)), pos,
                             int((w / 2) + (length / 2)), pos)
 
+    def drawWidget(self, qp):
+        size = self.size()
+        w = size.width()
+        h = size.height()
+
+        qp.translate(w / 2, h / 2)
+        qp.rotate(self.roll)
+        qp.translate(0, (self.pitch * h) / 50)
+        qp.translate(-w / 2, -h / 2)
+        qp.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+
+        # Draw the blue
+        qp.setPen(QtGui.QColor(0, 61, 144))
+        qp.setBrush(QtGui.QColor(0, 61, 144))
+        qp.drawRect(-w, int(h / 2), 3 * w, -3 * h)
+
+        # Draw the marron
+        qp.setPen(QtGui.QColor(59, 41, 39))
+        qp.setBrush(QtGui.QColor(59, 41, 39))
+        qp.drawRect(-w, int(h / 2), 3 * w, 3 * h)
+
+        qp.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform)
+        left, top, ladder = self._ladder_layer(w, h)
+        qp.drawPixmap(left, top, ladder)
+
         qp.setWorldMatrixEnabled(False)
 
         pen = QtGui.QPen(QtGui.QColor(0, 0, 0), 2, Qt.PenStyle.SolidLine)
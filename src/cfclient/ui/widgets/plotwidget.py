@@ -32,17 +32,17 @@ and manipulating the plot.
 For more advanced plotting save the data and use an external application.
 """
 
-from PyQt6 import QtWidgets, uic
-
-from time import time
+from PyQt6 import QtWidgets
 
 import logging
 
 from PyQt6.QtWidgets import QButtonGroup
+from PyQt6.QtCore import QTimer
 from PyQt6.QtCore import *  # noqa
 from PyQt6.QtWidgets import *  # noqa
 
 import cfclient
+from cfclient.utils.uicache import load_ui_type
 
 __author__ = 'Bitcraze AB'
 __all__ = ['PlotWidget']
@@ -50,14 +50,14 @@ __all__ = ['PlotWidget']
 logger = logging.getLogger(__name__)
 
 (plot_widget_class, connect_widget_base_class) = (
-    uic.loadUiType(cfclient.module_path + '/ui/widgets/plotter.ui'))
+    load_ui_type(cfclient.module_path + '/ui/widgets/plotter.ui'))
 
 # Try the imports for PyQtGraph to see if it is installed
 try:
     import pyqtgraph as pg
     from pyqtgraph import ViewBox
     import pyqtgraph.console  # noqa
-    import numpy as np  # noqa
+    import numpy as np
 
     _pyqtgraph_found = True
 except Exception:
@@ -78,14 +78,51 @@ except Exception:
     pass
 
 
+# Number of samples kept per curve, enough for the longest time window that
+# can be selected (59 s) at 1 kHz
+DEFAULT_HISTORY_LENGTH = 60000
+
+
+class _DecimationLevel:
+    """
+    Min/max points of complete buckets of samples for one bucket size. Once a
+    bucket is full its samples never change, so the points are only
+    calculated once and kept in a ring buffer indexed by bucket number.
+    """
+
+    def __init__(self, bucket_size, history_length):
+        self.bucket_size = bucket_size
+        self.capacity = history_length // bucket_size + 2
+        # x/y of the first and x/y of the last extreme value in each bucket
+        self.points = np.zeros((self.capacity, 4))
+        # Range of bucket numbers that are calculated
+        self.first = 0
+        self.end = 0
+
+
 class PlotItemWrapper:
     """Wrapper for PlotDataItem to handle what data is shown"""
 
-    def __init__(self, curve):
-        """Initialize"""
-        self.data = []
-        self.ts = []
+    # Smallest bucket size that is worth decimating with, with less than
+    # this the min/max points are as many as the raw samples
+    MIN_BUCKET_SIZE = 4
+
+    def __init__(self, curve, history_length=DEFAULT_HISTORY_LENGTH):
+        """
+        Initialize
+
+        curve - the PlotDataItem to draw the data with
+        history_length - number of samples kept, older samples are dropped
+        """
         self.curve = curve
+        self._capacity = history_length
+        # Every sample is stored twice, history_length apart, so that any
+        # window of the stored history is a contiguous slice of the buffers
+        # and can be handed to the curve without copying.
+        self._data = np.zeros(2 * history_length)
+        self._ts = np.zeros(2 * history_length)
+        self._count = 0
+        self._levels = {}
 
     def add_point(self, p, ts):
         """
@@ -94,29 +131,107 @@ class PlotItemWrapper:
         p - point
         ts - timestamp in ms
         """
-        self.data.append(p)
-        self.ts.append(ts)
+        i = self._count % self._capacity
+        self._data[i] = self._data[i + self._capacity] = p
+        self._ts[i] = self._ts[i + self._capacity] = ts
+        self._count += 1
 
-    def show_data(self, start, stop):
+    def show_data(self, start, stop, max_points=None):
         """
         Set what data should be shown from the curve. This is done to keep
         performance when many points have been added.
+
+        start/stop are sample numbers counted from the first added point,
+        samples that have been dropped from the history are not shown.
+        max_points is the approximate width of the plot in pixels, if there
+        are a lot more samples than that in the window they are reduced to
+        the min and max value per group of samples so peaks are still shown.
+        """
+        limit = min(max(stop, 1), self._count)
+        start = min(max(start, self._count - self._capacity), limit - 1)
+        offset = start % self._capacity
+        end = offset + limit - start
+
+        decimated = None
+        if max_points:
+            decimated = self._decimate(start, limit, max_points)
+        if decimated:
+            self.curve.setData(y=decimated[1], x=decimated[0])
+        else:
+            self.curve.setData(y=self._data[offset:end],
+                               x=self._ts[offset:end])
+        return [self._ts[offset], self._ts[end - 1]]
+
+    def _window(self, start, limit):
+        """Get views of the timestamps and data for samples [start, limit)"""
+        offset = start % self._capacity
+        end = offset + limit - start
+        return self._ts[offset:end], self._data[offset:end]
+
+    def _decimate(self, start, limit, max_points):
+        """
+        Reduce the samples [start, limit) to about two points per pixel.
+        Returns the x and y arrays, or None if there is no need to decimate.
         """
-        limit = min(stop, len(self.data))
-        self.curve.setData(y=self.data[start:limit], x=self.ts[start:limit])
-        return [self.ts[start], self.ts[limit - 1]]
+        if limit - start <= self.MIN_BUCKET_SIZE * max_points:
+            return None
+        bucket_size = 1 << int(np.ceil(np.log2((limit - start) / max_points)))
+
+        # The bucket size only changes when the window is twice as wide, so
+        # the buckets calculated for earlier frames can be reused
+        level = self._levels.get(bucket_size)
+        if level is None:
+            level = _DecimationLevel(bucket_size, self._capacity)
+            self._levels[bucket_size] = level
+
+        first = -(-start // bucket_size)
+        end = limit // bucket_size
+        if first >= end:
+            return None
+
+        if not level.first <= first <= level.end:
+            level.first = level.end = first
+        if level.end < end:
+            self._calculate_buckets(level, level.end, end)
+            level.end = end
+            level.first = max(level.first, end - level.capacity)
+
+        points = level.points.take(
+            np.arange(first, end) % level.capacity, axis=0).reshape(-1, 2)
+        head_ts, head_data = self._window(start, first * bucket_size)
+        tail_ts, tail_data = self._window(end * bucket_size, limit)
+
+        return (np.concatenate((head_ts, points[:, 0], tail_ts)),
+                np.concatenate((head_data, points[:, 1], tail_data)))
+
+    def _calculate_buckets(self, level, first, end):
+        """Calculate the min/max points for the buckets [first, end)"""
+        size = level.bucket_size
+        ts, data = self._window(first * size, end * size)
+        ts = ts.reshape(-1, size)
+        data = data.reshape(-1, size)
+
+        rows = np.arange(end - first)
+        i_min = data.argmin(axis=1)
+        i_max = data.argmax(axis=1)
+        # Keep the points in time order within the bucket
+        min_first = i_min <= i_max
+        i_1 = np.where(min_first, i_min, i_max)
+        i_2 = np.where(min_first, i_max, i_min)
+
+        level.points[np.arange(first, end) % level.capacity] = np.column_stack(
+            (ts[rows, i_1], data[rows, i_1], ts[rows, i_2], data[rows, i_2]))
 
 
 class PlotWidget(QtWidgets.QWidget, plot_widget_class):
     """Wrapper widget for PyQtGraph adding some extra buttons"""
 
-    def __init__(self, parent=None, fps=100, title="", *args):
+    def __init__(self, parent=None, fps=100, title="",
+                 history_length=DEFAULT_HISTORY_LENGTH, *args):
         super(PlotWidget, self).__init__(*args)
         self.setupUi(self)
 
-        # Limit the plot update to 10Hz
-        self._ts = time()
-        self._delay = 0.1
+        self._history_length = history_length
 
         # Check if we could import PyQtGraph, if not then stop here
         if not _pyqtgraph_found:
@@ -187,6 +302,24 @@ class PlotWidget(QtWidgets.QWidget, plot_widget_class):
         self._draw_graph = True
         self._auto_redraw.stateChanged.connect(self._auto_redraw_change)
 
+        # Incoming data is only stored when it arrives, the plot and the
+        # range widgets are updated at most once per frame while rendering
+        # is started
+        self._new_data = False
+        self._render_timer = QTimer(self)
+        self._render_timer.setInterval(int(1000 / fps))
+        self._render_timer.timeout.connect(self._render)
+
+    def start_rendering(self):
+        """Start drawing the data added to the plot, once per frame"""
+        if self.can_enable:
+            self._render_timer.start()
+
+    def stop_rendering(self):
+        """Stop drawing the data, it is still stored"""
+        if self.can_enable:
+            self._render_timer.stop()
+
     def _auto_redraw_change(self, state):
         """Callback from the auto redraw checkbox"""
         if state == 0:
@@ -272,7 +405,7 @@ class PlotWidget(QtWidgets.QWidget, plot_widget_class):
         pen - color of curve (using r for red and so on..)
         """
         self._items[title] = PlotItemWrapper(
-            self._plot_widget.plot(name=title, pen=pen))
+            self._plot_widget.plot(name=title, pen=pen), self._history_length)
 
     def add_data(self, data, ts):
         """
@@ -292,6 +425,21 @@ class PlotWidget(QtWidgets.QWidget, plot_widget_class):
             self._dtime = ts - self._last_ts
         self._last_ts = ts
 
+        for name in self._items:
+            self._items[name].add_point(data[name], ts)
+
+        self._last_item = self._last_item + 1
+        self._new_data = True
+
+    def _render(self):
+        """
+        Called once per frame to update the X-range and draw the data that
+        has been added since the last frame
+        """
+        if not self._new_data:
+            return
+        self._new_data = False
+
         x_min_limit = 0
         x_max_limit = 0
         # We are adding new datasets, calculate what we should show.
@@ -309,13 +457,11 @@ class PlotWidget(QtWidgets.QWidget, plot_widget_class):
             x_min_limit = max(0, int((self._range_x_min.value() * 1000. - self._first_ts) / self._dtime))
             x_max_limit = max(0, int((self._range_x_max.value() * 1000. - self._first_ts) / self._dtime))
 
-        for name in self._items:
-            self._items[name].add_point(data[name], ts)
-            if self._draw_graph and time() > self._ts + self._delay:
+        if self._draw_graph:
+            max_points = self._plot_widget.width()
+            for name in self._items:
                 [self._x_min, self._x_max] = self._items[name].show_data(
-                    x_min_limit, x_max_limit)
-        if time() > self._ts + self._delay:
-            self._ts = time()
+                    x_min_limit, x_max_limit, max_points)
         if (self._enable_samples_x.isChecked() and self._dtime and
                 self._last_item < self._nbr_samples):
             self._x_max = self._x_min + self._nbr_samples * self._dtime
@@ -325,7 +471,6 @@ class PlotWidget(QtWidgets.QWidget, plot_widget_class):
         elif (self._enable_range_x.isChecked() and self._dtime) and self._last_item < x_max_limit:
             self._x_max = self._x_min + (x_max_limit - x_min_limit) * self._dtime
 
-        self._last_item = self._last_item + 1
         self._plot_widget.getViewBox().setRange(
             xRange=(self._x_min, self._x_max))
 
@@ -338,6 +483,7 @@ class PlotWidget(QtWidgets.QWidget, plot_widget_class):
 
         self._items = {}
         self._last_item = 0
+        self._new_data = False
         self._last_ts = None
         self._first_ts = None
         self._dtime = None
@@ -44,6 +44,7 @@ import glob
 import traceback
 import logging
 import shutil
+import time
 
 from . import inputreaders as readers
 from . import inputinterfaces as interfaces
@@ -53,6 +54,7 @@ from cfclient.utils.config import Config
 from cfclient.utils.config_manager import ConfigManager
 
 from cfclient.utils.periodictimer import PeriodicTimer
+from .inputtimer import InputTimer
 from cflib.utils.callbacks import Caller
 from .mux.nomux import NoMux
 from .mux.takeovermux import TakeOverMux
@@ -83,7 +85,13 @@ class JoystickReader(object):
     ASSISTED_CONTROL_HEIGHTHOLD = 2
     ASSISTED_CONTROL_HOVER = 3
 
-    def __init__(self, do_device_discovery=True):
+    def __init__(self, do_device_discovery=True, deferred=False):
+        """
+        If deferred is True the input maps are not loaded and the device
+        discovery is not started until load_input_maps() and
+        start_device_discovery() are called, so it can be done later or in
+        another thread.
+        """
         self._input_device = None
 
         self._mux = [NoMux(self), TakeOverSelectiveMux(self),
@@ -144,27 +152,18 @@ class JoystickReader(object):
         self._available_devices = {}
 
         # TODO: The polling interval should be set from config file
-        self._read_timer = PeriodicTimer(INPUT_READ_PERIOD, self.read_input)
-
+        event_fds = None
+        if Config().get("input_event_driven"):
+            event_fds = self._input_fds
+        self._read_timer = InputTimer(INPUT_READ_PERIOD, self.read_input,
+                                      event_fds)
+        self._last_read_time = 0
+
+        self._discovery_timer = None
         if do_device_discovery:
             self._discovery_timer = PeriodicTimer(1.0,
-                                                  self._do_device_discovery)
-            self._discovery_timer.start()
-
-        # Check if user config exists, otherwise copy files
-        if not os.path.exists(ConfigManager().configs_dir):
-            logger.info("No user config found, copying dist files")
-            os.makedirs(ConfigManager().configs_dir)
-
-        for f in glob.glob(
-                cfclient.module_path + "/configs/input/[A-Za-z]*.json"):
-            dest = os.path.join(ConfigManager().
-                                configs_dir, os.path.basename(f))
-            if not os.path.isfile(dest):
-                logger.debug("Copying %s", f)
-                shutil.copy2(f, ConfigManager().configs_dir)
-
-        ConfigManager().get_list_of_configs()
+                                                  self._do_device_discovery,
+                                                  shared=True)
 
         self.input_updated = Caller()
         self.assisted_input_updated = Caller()
@@ -182,6 +181,32 @@ class JoystickReader(object):
         # Call with 3 bools (rp_limiting, yaw_limiting, thrust_limiting)
         self.limiting_updated = Caller()
 
+        if not deferred:
+            self.load_input_maps()
+            self.start_device_discovery()
+
+    def load_input_maps(self):
+        """Load the input maps, copying the default ones if needed"""
+        # Check if user config exists, otherwise copy files
+        if not os.path.exists(ConfigManager().configs_dir):
+            logger.info("No user config found, copying dist files")
+            os.makedirs(ConfigManager().configs_dir)
+
+        for f in glob.glob(
+                cfclient.module_path + "/configs/input/[A-Za-z]*.json"):
+            dest = os.path.join(ConfigManager().
+                                configs_dir, os.path.basename(f))
+            if not os.path.isfile(dest):
+                logger.debug("Copying %s", f)
+                shutil.copy2(f, ConfigManager().configs_dir)
+
+        ConfigManager().get_list_of_configs()
+
+    def start_device_discovery(self):
+        """Start looking for input devices, if enabled"""
+        if self._discovery_timer:
+            self._discovery_timer.start()
+
     def _get_device_from_name(self, device_name):
         """Get the raw device from a name"""
         for d in readers.devices():
@@ -351,6 +376,18 @@ class JoystickReader(object):
         self._read_timer.stop()
         self._selected_mux.pause()
 
+    def _input_fds(self):
+        """File descriptors of the devices that can notify about new input"""
+        return [d.fileno() for d in self._selected_mux.devices()]
+
+    def input_stats(self):
+        """
+        Statistics of the input reading: the number of periodic and event
+        triggered reads, the jitter of the periodic reads and the latency
+        from new input to the set-point for the event triggered reads (ms)
+        """
+        return self._read_timer.stats()
+
     def _set_thrust_slew_rate(self, rate):
         self._thrust_slew_rate = rate
         if rate > 0:
@@ -363,6 +400,11 @@ class JoystickReader(object):
 
     def read_input(self):
         """Read input data from the selected device"""
+        # Reads can be triggered by new input, so use the real time between
+        # them for integrating the height
+        now = time.monotonic()
+        dt = min(now - self._last_read_time, INPUT_READ_PERIOD)
+        self._last_read_time = now
         try:
             data = self._selected_mux.read()
 
@@ -420,7 +462,7 @@ class JoystickReader(object):
                     except Exception as e:
                         logger.warning("Exception while doing callback from"
                                        "input-device for estop: {}".format(e))
-                if data.toggled.arm and data._prev_btn_values["arm"]:
+                if data.toggled.arm and data.arm:
                     try:
                         self.arm_updated.call(data.arm)
                     except Exception as e:
@@ -466,7 +508,7 @@ class JoystickReader(object):
                     # Scale thrust to a value between -1.0 to 1.0
                     vz = (data.thrust - 32767) / 32767.0
                     # Integrate velocity setpoint
-                    self._target_height += vz * INPUT_READ_PERIOD
+                    self._target_height += vz * dt
                     # Cap target height
                     if self._target_height > self._hover_max_height:
                         self._target_height = self._hover_max_height
@@ -503,7 +545,7 @@ class JoystickReader(object):
                         # Scale thrust to a value between -1.0 to 1.0
                         vz = (data.thrust - 32767) / 32767.0
                         # Integrate velocity setpoint
-                        self._target_height += vz * INPUT_READ_PERIOD
+                        self._target_height += vz * dt
                         # Cap target height
                         if self._target_height > self._hover_max_height:
                             self._target_height = self._hover_max_height
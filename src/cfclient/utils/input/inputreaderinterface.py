@@ -36,64 +36,95 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-class _ToggleState(dict):
+AXES = ("roll", "pitch", "yaw", "thrust")
+BUTTONS = ("pitchNeg", "pitchPos", "rollNeg", "rollPos", "assistedControl",
+           "estop", "arm", "exitapp", "alt1", "alt2", "muxswitch")
+
+# Bit used for each button in the toggled and pressed masks
+_BUTTON_BITS = {button: 1 << i for i, button in enumerate(BUTTONS)}
+_INDICATORS = frozenset(AXES + BUTTONS)
+
+
+class _ToggleState:
+    """The buttons that changed state in the last read, as attributes"""
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
 
     def __getattr__(self, attr):
-        return self.get(attr)
+        # Buttons not known by InputData are never toggled
+        return False
+
+
+def _toggled_property(bit):
+    return property(lambda self: self._data._toggled & bit != 0)
 
-    __setattr__ = dict.__setitem__
-    __delattr__ = dict.__delitem__
+
+for _button, _bit in _BUTTON_BITS.items():
+    setattr(_ToggleState, _button, _toggled_property(_bit))
+del _button, _bit
 
 
 class InputData:
+    """
+    The input read from a device. The axes and buttons are slots, and which
+    buttons are pressed and have been toggled are kept as bitmasks, so the
+    same object can be updated for each read without allocating anything.
+    """
+    __slots__ = AXES + BUTTONS + ("toggled", "_toggled", "_pressed",
+                                  "_extra")
 
     def __init__(self):
-        # self._toggled = {}
-        self._axes = ("roll", "pitch", "yaw", "thrust")
-        self._buttons = ("pitchNeg", "pitchPos", "rollNeg", "rollPos",
-                         "assistedControl", "estop", "arm",
-                         "exitapp", "alt1", "alt2", "muxswitch")
-        for axis in self._axes:
-            self.__dict__[axis] = 0.0
-        self.toggled = _ToggleState()
-        self._prev_btn_values = {}
-        for button in self._buttons:
-            self.__dict__[button] = False
-            self.toggled[button] = False
-            self._prev_btn_values[button] = False
+        self.reset_axes()
+        self.reset_buttons()
+        self.toggled = _ToggleState(self)
+        self._toggled = 0
+        self._pressed = 0
+        # Values mapped to names that are not axes or buttons
+        self._extra = {}
 
     def get_all_indicators(self):
-        return self._axes + self._buttons
-
-    def _check_toggle(self, key, data):
-        if key not in self._prev_btn_values:
-            self._prev_btn_values[key] = data
-        elif self._prev_btn_values[key] != data:
-            self._prev_btn_values[key] = data
-            return True
-        return False
+        return AXES + BUTTONS
 
     def reset_axes(self):
-        for axis in self._axes:
-            self.__dict__[axis] = 0.0
+        self.roll = 0.0
+        self.pitch = 0.0
+        self.yaw = 0.0
+        self.thrust = 0.0
 
     def reset_buttons(self):
-        for button in self._buttons:
-            self.__dict__[button] = False
+        self.pitchNeg = False
+        self.pitchPos = False
+        self.rollNeg = False
+        self.rollPos = False
+        self.assistedControl = False
+        self.estop = False
+        self.arm = False
+        self.exitapp = False
+        self.alt1 = False
+        self.alt2 = False
+        self.muxswitch = False
 
     def set(self, name, value):
-        try:
-            if name in self._buttons:
-                if self._check_toggle(name, value):
-                    self.toggled[name] = True
-                else:
-                    self.toggled[name] = False
-        except KeyError:
-            pass
-        self.__dict__[name] = value
+        bit = _BUTTON_BITS.get(name)
+        if bit is not None:
+            # The button is toggled if the value is not the same as the
+            # last time it was set
+            if (self._pressed & bit != 0) != bool(value):
+                self._toggled |= bit
+                self._pressed ^= bit
+            else:
+                self._toggled &= ~bit
+        if name in _INDICATORS:
+            setattr(self, name, value)
+        else:
+            self._extra[name] = value
 
     def get(self, name):
-        return self.__dict__[name]
+        if name in _INDICATORS:
+            return getattr(self, name)
+        return self._extra[name]
 
 
 class InputReaderInterface(object):
@@ -143,6 +174,13 @@ class InputReaderInterface(object):
     def close(self):
         return
 
+    def fileno(self):
+        """
+        File descriptor that becomes readable when the device has new input,
+        None if the device has to be polled.
+        """
+        return None
+
     @staticmethod
     def devices():
         """List all the available devices."""
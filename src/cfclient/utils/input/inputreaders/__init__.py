@@ -101,43 +101,62 @@ class InputDevice(InputReaderInterface):
     def close(self):
         self._reader.close(self.id)
 
+    def fileno(self):
+        if hasattr(self._reader, "fileno"):
+            return self._reader.fileno(self.id)
+        return None
+
     def set_dead_band(self, db):
         self.db = db
 
+    @property
+    def input_map(self):
+        return self._input_map
+
+    @input_map.setter
+    def input_map(self, input_map):
+        # Look up the mapped axes and buttons once instead of for each read,
+        # the map is set again each time it is changed
+        self._input_map = input_map
+        self._axes_map = []
+        self._buttons_map = []
+        for index, mapping in (input_map or {}).items():
+            try:
+                if index.startswith("Input.AXIS-") and \
+                        mapping["type"] == "Input.AXIS":
+                    self._axes_map.append((int(index[11:]), mapping["key"],
+                                           mapping["offset"],
+                                           mapping["scale"]))
+                elif index.startswith("Input.BUTTON-") and \
+                        mapping["type"] == "Input.BUTTON":
+                    self._buttons_map.append((int(index[13:]),
+                                              mapping["key"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        self._axes_map.sort(key=lambda m: m[0])
+        self._buttons_map.sort(key=lambda m: m[0])
+
     def read(self, include_raw=False):
         [axis, buttons] = self._reader.read(self.id)
+        data = self.data
 
         # To support split axis we need to zero all the axis
-        self.data.reset_axes()
+        data.reset_axes()
 
-        i = 0
-        for a in axis:
-            index = "Input.AXIS-%d" % i
-            try:
-                if self.input_map[index]["type"] == "Input.AXIS":
-                    key = self.input_map[index]["key"]
-                    axisvalue = a + self.input_map[index]["offset"]
-                    axisvalue = axisvalue / self.input_map[index]["scale"]
-                    self.data.set(key, axisvalue + self.data.get(key))
-            except (KeyError, TypeError):
-                pass
-            i += 1
+        for i, key, offset, scale in self._axes_map:
+            if i < len(axis):
+                try:
+                    data.set(key, (axis[i] + offset) / scale + data.get(key))
+                except (KeyError, TypeError):
+                    pass
 
         # Workaround for fixing issues during mapping (remapping buttons while
         # they are pressed.
-        self.data.reset_buttons()
+        data.reset_buttons()
 
-        i = 0
-        for b in buttons:
-            index = "Input.BUTTON-%d" % i
-            try:
-                if self.input_map[index]["type"] == "Input.BUTTON":
-                    key = self.input_map[index]["key"]
-                    self.data.set(key, True if b == 1 else False)
-            except (KeyError, TypeError):
-                # Button not mapped, ignore..
-                pass
-            i += 1
+        for i, key in self._buttons_map:
+            if i < len(buttons):
+                data.set(key, True if buttons[i] == 1 else False)
 
         self.data.roll = InputDevice.deadband(self.data.roll, self.db)
         self.data.pitch = InputDevice.deadband(self.data.pitch, self.db)
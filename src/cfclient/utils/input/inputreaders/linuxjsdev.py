@@ -49,6 +49,9 @@ __all__ = ['Joystick']
 logger = logging.getLogger(__name__)
 
 JS_EVENT_FMT = "@IhBB"
+JS_EVENT = struct.Struct(JS_EVENT_FMT)
+# The kernel buffers up to 64 events per reader, read all of them at once
+JS_EVENT_READ_COUNT = 64
 JE_TIME = 0
 JE_VALUE = 1
 JE_TYPE = 2
@@ -133,19 +136,15 @@ class _JS():
         self._f.close()
         self._f = None
 
+    def fileno(self):
+        """File descriptor of the opened device, None if not opened"""
+        if not self._f:
+            return None
+        return self._f.fileno()
+
     def __initvalues(self):
         """Read the buttons and axes initial values from the js device"""
-        for _ in range(len(self.axes) + len(self.buttons)):
-            data = self._f.read(struct.calcsize(JS_EVENT_FMT))
-            jsdata = struct.unpack(JS_EVENT_FMT, data)
-            self.__updatestate(jsdata)
-
-    def __updatestate(self, jsdata):
-        """Update the internal absolute state of buttons and axes"""
-        if jsdata[JE_TYPE] & JS_EVENT_AXIS != 0:
-            self.axes[jsdata[JE_NUMBER]] = jsdata[JE_VALUE] / 32768.0
-        elif jsdata[JE_TYPE] & JS_EVENT_BUTTON != 0:
-            self.buttons[jsdata[JE_NUMBER]] = jsdata[JE_VALUE]
+        self._read_all_events()
 
     def __decode_event(self, jsdata):
         """ Decode a jsdev event into a dict """
@@ -161,19 +160,26 @@ class _JS():
 
     def _read_all_events(self):
         """Consume all the events queued up in the JS device"""
+        read_size = JS_EVENT.size * JS_EVENT_READ_COUNT
+        axes = self.axes
+        buttons = self.buttons
         try:
             while True:
-                data = self._f.read(struct.calcsize(JS_EVENT_FMT))
-                jsdata = struct.unpack(JS_EVENT_FMT, data)
-                self.__updatestate(jsdata)
+                # The device only returns whole events
+                data = os.read(self._f.fileno(), read_size)
+                for _, value, evt_type, number in JS_EVENT.iter_unpack(data):
+                    if evt_type & JS_EVENT_AXIS != 0:
+                        axes[number] = value / 32768.0
+                    elif evt_type & JS_EVENT_BUTTON != 0:
+                        buttons[number] = value
+                if len(data) < read_size:
+                    break
         except IOError as e:
             if e.errno != 11:
                 logger.info(str(e))
                 self._f.close()
                 self._f = None
                 raise IOError("Device has been disconnected")
-        except TypeError:
-            pass
         except ValueError:
             # This will happen if I/O operations are done on a closed device,
             # which is the case when you first close and then open the device
@@ -234,3 +240,7 @@ class Joystick():
     def read(self, device_id):
         """ Returns a list of all joystick event since the last call """
         return self._js[device_id].read()
+
+    def fileno(self, device_id):
+        """File descriptor that can be used to wait for new events"""
+        return self._js[device_id].fileno()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2024 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License along with
+#  this program; if not, write to the Free Software Foundation, Inc., 51
+#  Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Timer used to read the input devices. The input is read on absolute deadlines
+so the rate does not drift, and optionally as soon as a device that has a file
+descriptor (like the Linux jsdev devices) has new events.
+"""
+
+import logging
+import select
+import time
+from threading import Thread
+
+from cfclient.utils.periodictimer import next_deadline
+
+__author__ = 'Bitcraze AB'
+__all__ = ['InputTimer']
+
+logger = logging.getLogger(__name__)
+
+# Minimum time between two reads triggered by device events, so a device
+# sending events very fast does not flood the Crazyflie with set-points
+EVENT_MIN_PERIOD = 0.004
+
+
+class InputTimer:
+    """
+    Call a callback every period seconds. If event_fds is set it is called
+    to get the file descriptors of the devices being read, and the callback
+    is also called when one of them has new input.
+    """
+
+    def __init__(self, period, callback, event_fds=None):
+        self._period = period
+        self._callback = callback
+        self._event_fds = event_fds
+        self._thread = None
+        self._stats = _InputTimerStats()
+
+    def start(self):
+        """Start the timer"""
+        if self._thread:
+            logger.warning("Timer already started, not restarting")
+            return
+        self._thread = _InputTimerThread(self._period, self._callback,
+                                         self._event_fds, self._stats)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the timer"""
+        if self._thread:
+            self._thread.stop()
+            self._thread = None
+            logger.debug("Input timer stats: {}".format(self.stats()))
+
+    def stats(self):
+        """
+        Get the statistics of the reads since the timer was created, times
+        are in ms
+        """
+        return self._stats.summary()
+
+
+class _InputTimerStats:
+
+    def __init__(self):
+        self.reads = 0
+        self.event_reads = 0
+        # How late the periodic reads are compared to their deadlines
+        self.late_total = 0.0
+        self.late_max = 0.0
+        # Time from a device having new input until the callback has
+        # been called
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def periodic_read(self, late):
+        self.reads += 1
+        self.late_total += late
+        self.late_max = max(self.late_max, late)
+
+    def event_read(self, latency):
+        self.event_reads += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def summary(self):
+        periodic = max(1, self.reads)
+        events = max(1, self.event_reads)
+        return {"reads": self.reads,
+                "event_reads": self.event_reads,
+                "jitter_mean": self.late_total / periodic * 1000,
+                "jitter_max": self.late_max * 1000,
+                "latency_mean": self.latency_total / events * 1000,
+                "latency_max": self.latency_max * 1000}
+
+
+class _InputTimerThread(Thread):
+
+    def __init__(self, period, callback, event_fds, stats):
+        super(_InputTimerThread, self).__init__()
+        self._period = period
+        self._callback = callback
+        self._event_fds = event_fds
+        self._stats = stats
+        self._stop_requested = False
+
+    def stop(self):
+        self._stop_requested = True
+
+    def _wait(self, timeout):
+        """
+        Wait for timeout seconds or until a device has new input. Returns
+        the time the input was detected, or None if there was no input.
+        """
+        fds = []
+        if self._event_fds:
+            fds = [fd for fd in self._event_fds() if fd is not None]
+        if fds:
+            try:
+                readable, _, _ = select.select(fds, [], [], timeout)
+                if readable:
+                    return time.monotonic()
+                return None
+            except (OSError, ValueError):
+                # The device was closed while waiting, it will not be in
+                # the list the next time
+                pass
+        time.sleep(timeout)
+        return None
+
+    def run(self):
+        deadline = time.monotonic() + self._period
+        last_event_read = 0
+        while not self._stop_requested:
+            now = time.monotonic()
+            # Do not wait for input until the minimum time between event
+            # triggered reads has passed
+            event_wait = last_event_read + EVENT_MIN_PERIOD - now
+            if event_wait > 0 and now + event_wait < deadline:
+                time.sleep(event_wait)
+                now = time.monotonic()
+
+            event_time = self._wait(max(0, deadline - now))
+            if self._stop_requested:
+                break
+
+            now = time.monotonic()
+            if event_time is not None:
+                self._callback()
+                last_event_read = time.monotonic()
+                self._stats.event_read(last_event_read - event_time)
+                # Keep sending at least every period after the new input
+                deadline = last_event_read + self._period
+                continue
+
+            if now < deadline:
+                continue
+            self._callback()
+            self._stats.periodic_read(now - deadline)
+            deadline = next_deadline(deadline, self._period, time.monotonic())
@@ -37,14 +37,13 @@ import logging
 import os
 import re
 import shutil
+from threading import Event, Lock
 
 import cfclient
 from cflib.crazyflie.log import LogVariable, LogConfig
 
-from PyQt6 import QtGui
-
 __author__ = 'Bitcraze AB'
-__all__ = ['LogVariable', 'LogConfigReader']
+__all__ = ['LogVariable', 'LogConfigReader', 'read_log_config']
 
 logger = logging.getLogger(__name__)
 
@@ -53,22 +52,77 @@ DEFAULT_CATEGORY_NAME = 'category'
 
 FILE_REGEX_YAML = "Config *.yaml;;All *.*"
 
+# Max time (in seconds) to wait for deferred reading of the configurations
+# when the Crazyflie is connected
+READ_TIMEOUT = 10
+
+# The default configurations can be copied both from the startup thread and
+# when the Crazyflie is connected
+_copy_lock = Lock()
+
+
+def read_log_config(conf_path):
+    """Read a log configuration file and return it as a LogConfig"""
+    with open(conf_path) as f:
+        data = json.load(f)
+        infoNode = data["logconfig"]["logblock"]
+
+        logConf = LogConfig(infoNode["name"],
+                            int(infoNode["period"]))
+        for v in data["logconfig"]["logblock"]["variables"]:
+            if v["type"] == "TOC":
+                logConf.add_variable(str(v["name"]), v["fetch_as"])
+            else:
+                logConf.add_variable("Mem", v["fetch_as"],
+                                     v["stored_as"],
+                                     int(v["address"], 16))
+        return logConf
+
 
 class LogConfigReader():
     """Reads logging configurations from file"""
 
-    def __init__(self, crazyflie):
-
+    def __init__(self, crazyflie, deferred=False):
+        """
+        If deferred is True the default configurations are not copied until
+        read_configs() is called, so it can be done later or in another
+        thread. When the Crazyflie is connected it waits for that first.
+        """
         self._log_configs = {}
         self.dsList = []
-        # Check if user config exists, otherwise copy files
-        if (not os.path.exists(cfclient.config_path + "/log")):
-            logger.info("No user config found, copying dist files")
-            shutil.copytree(cfclient.module_path + "/configs/log", cfclient.config_path + "/log")
+        self._configs_read = Event()
+        if not deferred:
+            self._copy_default_configs()
+            self._configs_read.set()
         self._cf = crazyflie
         self._cf.connected.add_callback(self._connected)
 
+    def _copy_default_configs(self):
+        # Check if user config exists, otherwise copy files
+        with _copy_lock:
+            if (not os.path.exists(cfclient.config_path + "/log")):
+                logger.info("No user config found, copying dist files")
+                try:
+                    shutil.copytree(cfclient.module_path + "/configs/log", cfclient.config_path + "/log")
+                except FileExistsError:
+                    # Created by another client started at the same time
+                    logger.debug("User config created while copying")
+
+    def read_configs(self):
+        """
+        Read the log configurations by category, they are read again when
+        the Crazyflie is connected
+        """
+        try:
+            self._copy_default_configs()
+            self._read_config_categories()
+        finally:
+            self._configs_read.set()
+
     def get_icons(self):
+        # Imported here so the log configurations can be read without Qt
+        from PyQt6 import QtGui
+
         client_path = os.path.abspath(os.path.join(os.path.dirname(__file__),
                                       os.pardir))
         icon_path = os.path.join(client_path, 'ui', 'icons')
@@ -237,20 +291,7 @@ class LogConfigReader():
             return DEFAULT_CONF_NAME + '1'
 
     def _get_conf(self, conf_path):
-        with open(conf_path) as f:
-            data = json.load(f)
-            infoNode = data["logconfig"]["logblock"]
-
-            logConf = LogConfig(infoNode["name"],
-                                int(infoNode["period"]))
-            for v in data["logconfig"]["logblock"]["variables"]:
-                if v["type"] == "TOC":
-                    logConf.add_variable(str(v["name"]), v["fetch_as"])
-                else:
-                    logConf.add_variable("Mem", v["fetch_as"],
-                                         v["stored_as"],
-                                         int(v["address"], 16))
-            return logConf
+        return read_log_config(conf_path)
 
     def _get_configpaths_recursively(self):
         """ Reads all configuration files from the log path and
@@ -304,6 +345,10 @@ class LogConfigReader():
     def _connected(self, link_uri):
         """Callback that is called once Crazyflie is connected"""
 
+        # Let deferred reading of the configurations finish first
+        if not self._configs_read.wait(READ_TIMEOUT):
+            logger.warning("Log configurations not read in time")
+        self._copy_default_configs()
         self._read_config_files()
         self._read_config_categories()
         # Just add all the configurations. Via callbacks other parts of the
@@ -28,72 +28,378 @@
 
 """
 Used to write log data to files.
+
+The data can either be written as CSV or in a compact binary format. The
+binary files start with a magic line and a JSON header line describing the
+columns, followed by fixed size little endian records. Binary files can be
+converted to CSV with convert_to_csv() or by running this module.
+
+For long sessions the files can be compressed and split into segments based
+on size or time. Each segment has its own header and an index file lists the
+segments with the first and last timestamp in each of them.
 """
 
 import os
 import datetime
+import gzip
+import json
+import queue
+import struct
+import sys
+from threading import Event, Thread
 
 import logging
 
+from cflib.crazyflie.log import LogTocElement
+
 import cfclient
+from .singleton import Singleton
 
 __author__ = 'Bitcraze AB'
-__all__ = ['LogWriter']
+__all__ = ['LogWriter', 'convert_to_csv']
 
 logger = logging.getLogger(__name__)
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BINARY_MAGIC = b'CFLOG1\n'
+
+COMPRESSION_NONE = ''
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_ZSTD = 'zstd'
+
+_compression_extensions = {COMPRESSION_NONE: '',
+                           COMPRESSION_GZIP: '.gz',
+                           COMPRESSION_ZSTD: '.zst'}
+
+
+def _open_log_file(filename, mode, compression=None):
+    """Open a log file, using the extension to find the compression if it is
+    not given"""
+    if compression is None:
+        compression = COMPRESSION_NONE
+        for c, extension in _compression_extensions.items():
+            if extension and filename.endswith(extension):
+                compression = c
+
+    if compression == COMPRESSION_GZIP:
+        return gzip.open(filename, mode)
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.open(filename, mode)
+    return open(filename, mode)
+
+
+class _CsvEncoder:
+    """Encode samples as lines in a CSV file"""
+
+    extension = 'csv'
+    mode = 'wt'
+
+    def __init__(self, block):
+        self._columns = [v.name for v in block.variables]
+
+    def header(self):
+        return ','.join(['Timestamp'] + self._columns) + '\n'
+
+    def encode(self, samples):
+        columns = self._columns
+        return ''.join(
+            ','.join(['%d' % timestamp] + [str(data[c]) for c in columns]) +
+            '\n' for timestamp, data in samples)
+
+
+class _BinaryEncoder:
+    """Encode samples as packed records using the types of the variables"""
+
+    extension = 'cflog'
+    mode = 'wb'
+
+    def __init__(self, block):
+        self._columns = [v.name for v in block.variables]
+        self._name = block.name
+        self._types = [LogTocElement.get_cstring_from_id(v.fetch_as)
+                       for v in block.variables]
+        self._struct = struct.Struct('<I' + ''.join(
+            LogTocElement.get_unpack_string_from_id(v.fetch_as)[1:]
+            for v in block.variables))
+
+    def header(self):
+        header = {'block': self._name,
+                  'columns': ['Timestamp'] + self._columns,
+                  'types': ['uint32_t'] + self._types,
+                  'format': self._struct.format}
+        return BINARY_MAGIC + json.dumps(header).encode('utf-8') + b'\n'
+
+    def encode(self, samples):
+        pack = self._struct.pack
+        columns = self._columns
+        return b''.join(pack(timestamp, *[data[c] for c in columns])
+                        for timestamp, data in samples)
+
+
+class _WriterService(metaclass=Singleton):
+    """
+    Thread shared by all LogWriters that writes the queued samples to the
+    files in batches. The queue is bounded so a slow disk can not make the
+    memory grow without limit, samples that do not fit are dropped instead of
+    blocking the thread delivering the log data.
+    """
+
+    QUEUE_SIZE = 20000
+    # Max number of samples encoded and written in one go
+    MAX_BATCH = 500
+    # Max time (in seconds) to wait for the samples of a writer to be written
+    FLUSH_TIMEOUT = 10
+
+    def __init__(self):
+        self._queue = queue.Queue(self.QUEUE_SIZE)
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        self.peak_queue_size = 0
+
+    def put(self, writer, timestamp, data):
+        """Queue a sample for writing, returns False if it was dropped"""
+        try:
+            self._queue.put_nowait((writer, timestamp, data))
+        except queue.Full:
+            return False
+        size = self._queue.qsize()
+        if size > self.peak_queue_size:
+            self.peak_queue_size = size
+        return True
+
+    def flush(self, writer, generation):
+        """
+        Wait until all samples queued for the writer have been written, then
+        close the file it opened when it was started the generation:th time.
+        Returns False if it was not done in FLUSH_TIMEOUT.
+        """
+        done = Event()
+        try:
+            self._queue.put((writer, None, (generation, done)),
+                            timeout=self.FLUSH_TIMEOUT)
+        except queue.Full:
+            return False
+        return done.wait(self.FLUSH_TIMEOUT)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.MAX_BATCH:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            samples = {}
+            for writer, timestamp, data in batch:
+                if timestamp is None:
+                    # Flush request, data is the generation to close and
+                    # the event to set when done
+                    self._write(writer, samples.pop(writer, None))
+                    self._close(writer, *data)
+                else:
+                    samples.setdefault(writer, []).append((timestamp, data))
+            for writer in samples:
+                self._write(writer, samples[writer])
+
+    def _close(self, writer, generation, done):
+        try:
+            writer._close_file(generation)
+        except Exception as e:
+            logger.error("Could not close log file [%s]: %s",
+                         writer._filename, e)
+        finally:
+            done.set()
+
+    def _write(self, writer, samples):
+        if samples:
+            try:
+                writer._write_samples(samples)
+            except Exception as e:
+                logger.error("Could not write log data to [%s]: %s",
+                             writer._filename, e)
+
 
 class LogWriter():
     """Create a writer for a specific log block"""
 
-    def __init__(self, logblock, connected_ts=None, directory=None):
-        """Initialize the writer"""
+    FORMAT_CSV = 'csv'
+    FORMAT_BINARY = 'binary'
+
+    _encoders = {FORMAT_CSV: _CsvEncoder, FORMAT_BINARY: _BinaryEncoder}
+
+    def __init__(self, logblock, connected_ts=None, directory=None,
+                 file_format=FORMAT_CSV, compression=COMPRESSION_NONE,
+                 rotate_size=0, rotate_time=0):
+        """
+        Initialize the writer
+
+        file_format - FORMAT_CSV or FORMAT_BINARY
+        compression - COMPRESSION_NONE, COMPRESSION_GZIP or COMPRESSION_ZSTD
+        rotate_size - start a new file after this many bytes (before
+                      compression) has been written, 0 to disable
+        rotate_time - start a new file after this many seconds of data, 0 to
+                      disable
+        """
         self._block = logblock
         self._dir = directory
         self._connected_ts = connected_ts
 
-        self._dir = os.path.join(cfclient.config_path, "logdata",
-                                 connected_ts.strftime("%Y%m%dT%H-%M-%S"))
+        if self._dir is None:
+            self._dir = os.path.join(cfclient.config_path, "logdata",
+                                     connected_ts.strftime("%Y%m%dT%H-%M-%S"))
+        if file_format not in self._encoders:
+            logger.warning("Unknown log file format [%s], using %s",
+                           file_format, self.FORMAT_CSV)
+            file_format = self.FORMAT_CSV
+        if compression not in _compression_extensions:
+            logger.warning("Unknown log file compression [%s], not "
+                           "compressing", compression)
+            compression = COMPRESSION_NONE
+        if compression == COMPRESSION_ZSTD and not zstandard:
+            logger.warning("zstandard is not installed, using %s",
+                           COMPRESSION_GZIP)
+            compression = COMPRESSION_GZIP
+        self._file_format = file_format
+        self._compression = compression
+        self._rotate_size = rotate_size
+        self._rotate_time = rotate_time * 1000
         self._file = None
-        self._header_written = False
-        self._header_values = []
+        self._encoder = None
+        self._writing = False
+        # Samples dropped by the thread delivering the log data and by the
+        # writer service, kept apart since they are counted from two threads
+        self._dropped = 0
+        self._write_dropped = 0
         self._filename = None
-
-    def _write_header(self):
-        """Write the header to the file"""
-        if not self._header_written:
-            s = "Timestamp"
-            for v in self._block.variables:
-                s += "," + v.name
-                self._header_values.append(v.name)
-            s += '\n'
-            self._file.write(s)
-            self._header_written = True
+        self._basename = None
+        self._segments = []
+        # Set if a new segment could not be opened, the samples are then
+        # dropped until writing is restarted
+        self._failed = False
+        # Incremented each time writing is started, to know what file a
+        # flush request is for if writing was restarted before it was done
+        self._generation = 0
+        # Files of earlier generations whose flush requests were not done
+        # when writing was restarted, closed by the writer service
+        self._stale_files = []
 
     def _new_data(self, timestamp, data, logconf):
         """Callback when new data arrives from the Crazyflie"""
+        if self._writing:
+            if not _WriterService().put(self, timestamp, data):
+                self._dropped += 1
+
+    def _rotating(self):
+        return self._rotate_size > 0 or self._rotate_time > 0
+
+    def _open_segment(self):
+        """Open a new file and write the header to it"""
+        name = self._basename
+        if self._rotating():
+            name += ".{0:04d}".format(len(self._segments))
+        name += "." + self._encoder.extension + \
+                _compression_extensions[self._compression]
+        self._filename = os.path.join(self._dir, name)
+        self._file = _open_log_file(self._filename, self._encoder.mode,
+                                    self._compression)
+        self._file.write(self._encoder.header())
+        self._segments.append({'file': name,
+                               'first_timestamp': None,
+                               'last_timestamp': None,
+                               'samples': 0,
+                               'size': 0})
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self._rotating():
+            self._write_index()
+
+    def _write_index(self):
+        """Write the index describing the segments written so far"""
+        index = {'block': self._block.name,
+                 'format': self._file_format,
+                 'compression': self._compression,
+                 'segments': self._segments}
+        filename = os.path.join(self._dir, self._basename + ".index.json")
+        with open(filename, 'w') as f:
+            json.dump(index, f, indent=2)
+
+    def _write_samples(self, samples):
+        """Called from the writer service with a batch of samples"""
+        if self._failed:
+            self._write_dropped += len(samples)
+            return
+        # Samples arriving while stopping can end up after the flush
         if self._file:
-            s = "%d" % timestamp
-            for col in self._header_values:
-                s += "," + str(data[col])
-            s += '\n'
-            self._file.write(s)
+            segment = self._segments[-1]
+            # Only start a new file when there is data for it, to not end up
+            # with an empty last file
+            if segment['samples'] and (
+                    (self._rotate_size and
+                     segment['size'] >= self._rotate_size) or
+                    (self._rotate_time and
+                     segment['last_timestamp'] - segment['first_timestamp'] >=
+                     self._rotate_time)):
+                self._close_segment()
+                try:
+                    self._open_segment()
+                except Exception:
+                    self._failed = True
+                    self._write_dropped += len(samples)
+                    raise
+                segment = self._segments[-1]
+
+            encoded = self._encoder.encode(samples)
+            self._file.write(encoded)
+
+            if segment['first_timestamp'] is None:
+                segment['first_timestamp'] = samples[0][0]
+            segment['last_timestamp'] = samples[-1][0]
+            segment['samples'] += len(samples)
+            segment['size'] += len(encoded)
+
+    def _close_file(self, generation):
+        """Called from the writer service when all samples are written"""
+        while self._stale_files:
+            self._stale_files.pop().close()
+        # A flush request that timed out must not close the file of a later
+        # start
+        if generation == self._generation:
+            self._close_segment()
 
     def writing(self):
         """Return True if the file is open and we are using it,
         otherwise false"""
-        return True if self._file else False
+        return self._writing
+
+    def dropped_samples(self):
+        """Return the number of samples that could not be written since
+        writing was last started"""
+        return self._dropped + self._write_dropped
 
     def stop(self):
         """Stop the logging to file"""
-        if self._file:
-            self._file.close()
-            self._file = None
+        if self._writing:
             self._block.data_received_cb.remove_callback(self._new_data)
+            self._writing = False
+            # Wait for what is queued to be written and the file closed
+            if not _WriterService().flush(self, self._generation):
+                logger.warning("Timeout writing the data of block [%s] to "
+                               "file [%s]", self._block.name, self._filename)
+            if self.dropped_samples():
+                logger.warning("Dropped %d samples of block [%s]",
+                               self.dropped_samples(), self._block.name)
             logger.info("Stopped logging of block [%s] to file [%s]",
                         self._block.name, self._filename)
-            self._header_values = []
-            self._header_written = False
 
     def start(self):
         """Start the logging to file"""
@@ -104,15 +410,69 @@ class LogWriter():
         except OSError:
             logger.debug("logdata directory already exists")
 
-        if not self._file:
+        if not self._writing:
+            self._encoder = self._encoders[self._file_format](self._block)
             time_now = datetime.datetime.now()
             block_name_corr = self._block.name.replace('/', '-')
-            name = "{0}-{1}.csv".format(block_name_corr,
-                                        time_now.strftime(
-                                            "%Y%m%dT%H-%M-%S"))
-            self._filename = os.path.join(self._dir, name)
-            self._file = open(self._filename, 'w')
-            self._write_header()
+            self._basename = "{0}-{1}".format(block_name_corr,
+                                              time_now.strftime(
+                                                  "%Y%m%dT%H-%M-%S"))
+            self._generation += 1
+            if self._file is not None:
+                # Not closed yet since stopping timed out
+                self._stale_files.append(self._file)
+                self._file = None
+            self._segments = []
+            self._failed = False
+            self._open_segment()
+            self._dropped = 0
+            self._write_dropped = 0
+            self._writing = True
             self._block.data_received_cb.add_callback(self._new_data)
             logger.info("Started logging of block [%s] to file [%s]",
                         self._block.name, self._filename)
+
+
+def convert_to_csv(filename, csv_filename=None):
+    """
+    Convert a binary log file to a CSV file with the same content as if the
+    data had been logged as CSV. Returns the name of the CSV file.
+    """
+    if not csv_filename:
+        base = filename
+        for extension in _compression_extensions.values():
+            if extension and base.endswith(extension):
+                base = base[:-len(extension)]
+        csv_filename = os.path.splitext(base)[0] + '.csv'
+
+    with _open_log_file(filename, 'rb') as f:
+        content = f.read()
+    if not content.startswith(BINARY_MAGIC):
+        raise ValueError('[%s] is not a binary log file' % filename)
+    header, records = content[len(BINARY_MAGIC):].split(b'\n', 1)
+    header = json.loads(header.decode('utf-8'))
+
+    record = struct.Struct(header['format'])
+    # Drop a partially written last record, if any
+    records = records[:len(records) - len(records) % record.size]
+
+    with open(csv_filename, 'w') as f:
+        f.write(','.join(header['columns']) + '\n')
+        for values in record.iter_unpack(records):
+            f.write(','.join(['%d' % values[0]] +
+                             [str(v) for v in values[1:]]) + '\n')
+
+    return csv_filename
+
+
+def main():
+    """Convert the binary log files given on the command line to CSV"""
+    if len(sys.argv) < 2:
+        print('Usage: {} LOGFILE...'.format(sys.argv[0]))
+        sys.exit(1)
+    for filename in sys.argv[1:]:
+        print('{} -> {}'.format(filename, convert_to_csv(filename)))
+
+
+if __name__ == '__main__':
+    main()
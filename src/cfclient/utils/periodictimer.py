@@ -28,59 +28,236 @@
 """
 Implementation of a periodic timer that will call a callback every time
 the timer expires once started.
+
+The timer is scheduled on absolute deadlines from the monotonic clock, so the
+period does not drift with the time the callbacks take. Timers can either run
+in their own thread or share one scheduler thread. Each timer records
+histograms of the periods, the jitter and the overruns that can be dumped
+using dump_stats(). They are logged at debug level when a timer is stopped
+and, for all the timers, when the client exits.
 """
 
+import bisect
+import heapq
+import itertools
 import logging
-from threading import Thread
-from cflib.utils.callbacks import Caller
 import time
+import weakref
+from threading import Condition, Event, Thread
+from cflib.utils.callbacks import Caller
+
+from cfclient.utils.singleton import Singleton
 
 __author__ = 'Bitcraze AB'
-__all__ = ['PeriodicTimer']
+__all__ = ['PeriodicTimer', 'dump_stats', 'next_deadline']
 
 logger = logging.getLogger(__name__)
 
+# Upper limits (in ms) of the histogram bins, the last bin has no limit
+HISTOGRAM_BINS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# All the created timers, used when dumping the statistics
+_timers = weakref.WeakSet()
+
 
 class PeriodicTimer:
     """Create a periodic timer that will periodically call a callback"""
 
-    def __init__(self, period, callback):
+    def __init__(self, period, callback, shared=False, name=None):
+        """
+        If shared is True the callback is called from a scheduler thread
+        shared with the other shared timers, so it should be short.
+        """
         self._callbacks = Caller()
         self._callbacks.add_callback(callback)
         self._started = False
         self._period = period
+        self._shared = shared
         self._thread = None
+        self._run = None
+        self.name = name or getattr(callback, "__qualname__", str(callback))
+        self._stats = _TimerStats(period)
+        _timers.add(self)
 
     def start(self):
         """Start the timer"""
-        if self._thread:
+        if self._run:
             logger.warning("Timer already started, not restarting")
             return
-        self._thread = _PeriodicTimerThread(self._period, self._callbacks)
-        self._thread.setDaemon(True)
-        self._thread.start()
+        self._run = _TimerRun(self._period, self._callbacks, self._stats)
+        if self._shared:
+            _SharedScheduler().add(self._run)
+        else:
+            self._thread = _PeriodicTimerThread(self._run)
+            self._thread.daemon = True
+            self._thread.start()
 
     def stop(self):
         """Stop the timer"""
-        if self._thread:
-            self._thread.stop()
+        if self._run:
+            self._run.stop()
+            self._run = None
             self._thread = None
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(self._stats.dump(self.name))
 
+    def stats(self):
+        """
+        Get the number of calls and overruns, and the period, jitter and
+        overrun histograms as lists of counts for HISTOGRAM_BINS
+        """
+        return self._stats.summary()
 
-class _PeriodicTimerThread(Thread):
 
-    def __init__(self, period, caller):
-        super(_PeriodicTimerThread, self).__init__()
-        self._period = period
-        self._callbacks = caller
-        self._stop = False
+def dump_stats():
+    """Get the statistics of all the timers as text"""
+    lines = []
+    for timer in sorted(_timers, key=lambda t: t.name):
+        lines.append(timer._stats.dump(timer.name))
+    return "\n".join(lines)
+
+
+def next_deadline(deadline, period, now):
+    """
+    Get the deadline following deadline. The deadlines are absolute so the
+    period does not drift, but the ones that have already passed at now are
+    skipped instead of being called late.
+    """
+    deadline += period
+    if deadline < now:
+        deadline += ((now - deadline) // period + 1) * period
+    return deadline
+
+
+class _TimerStats:
+
+    def __init__(self, period):
+        self.period = period
+        self.calls = 0
+        self.overruns = 0
+        # Time between the calls
+        self.periods = [0] * (len(HISTOGRAM_BINS) + 1)
+        # How late the calls are compared to their deadlines
+        self.jitter = [0] * (len(HISTOGRAM_BINS) + 1)
+        # How far past the next deadline the calls ended
+        self.overrun = [0] * (len(HISTOGRAM_BINS) + 1)
+
+    @staticmethod
+    def _add(histogram, value):
+        histogram[bisect.bisect_left(HISTOGRAM_BINS, value * 1000)] += 1
+
+    def record(self, deadline, start, end, last_start):
+        self.calls += 1
+        if last_start is not None:
+            self._add(self.periods, start - last_start)
+        self._add(self.jitter, start - deadline)
+        if end > deadline + self.period:
+            self.overruns += 1
+            self._add(self.overrun, end - deadline - self.period)
+
+    def summary(self):
+        return {"calls": self.calls,
+                "overruns": self.overruns,
+                "bins": HISTOGRAM_BINS,
+                "period": list(self.periods),
+                "jitter": list(self.jitter),
+                "overrun": list(self.overrun)}
+
+    def dump(self, name):
+        def histogram(counts):
+            limits = ["<={}".format(b) for b in HISTOGRAM_BINS]
+            limits.append(">{}".format(HISTOGRAM_BINS[-1]))
+            return " ".join("{}:{}".format(limit, count)
+                            for limit, count in zip(limits, counts) if count)
+
+        return "\n".join([
+            "{} ({} ms): {} calls, {} overruns".format(
+                name, self.period * 1000, self.calls, self.overruns),
+            "  period (ms)  {}".format(histogram(self.periods)),
+            "  jitter (ms)  {}".format(histogram(self.jitter)),
+            "  overrun (ms) {}".format(histogram(self.overrun))])
+
+
+class _TimerRun:
+    """A started timer, from when it is started until it is stopped"""
+
+    def __init__(self, period, callbacks, stats):
+        self.period = period
+        self.deadline = time.monotonic() + period
+        self.stopped = Event()
+        self._callbacks = callbacks
+        self._stats = stats
+        self._last_start = None
 
     def stop(self):
-        self._stop = True
+        self.stopped.set()
 
-    def run(self):
-        while not self._stop:
-            time.sleep(self._period)
-            if self._stop:
-                break
+    def fire(self):
+        """Call the callbacks and schedule the next deadline"""
+        start = time.monotonic()
+        try:
             self._callbacks.call()
+        except Exception:
+            logger.exception("Exception in periodic timer callback")
+        end = time.monotonic()
+        if self.stopped.is_set():
+            return
+        self._stats.record(self.deadline, start, end, self._last_start)
+        self._last_start = start
+        self.deadline = next_deadline(self.deadline, self.period, end)
+
+
+class _PeriodicTimerThread(Thread):
+
+    def __init__(self, run):
+        super(_PeriodicTimerThread, self).__init__()
+        self._run = run
+
+    def run(self):
+        while not self._run.stopped.wait(
+                max(0, self._run.deadline - time.monotonic())):
+            self._run.fire()
+
+
+class _SharedScheduler(metaclass=Singleton):
+    """Thread calling the shared timers, in order of their deadlines"""
+
+    def __init__(self):
+        self._heap = []
+        # Keeps the order of timers with the same deadline
+        self._counter = itertools.count()
+        self._condition = Condition()
+        self._thread = Thread(target=self._schedule,
+                              name="PeriodicTimer scheduler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, run):
+        with self._condition:
+            heapq.heappush(self._heap,
+                           (run.deadline, next(self._counter), run))
+            self._condition.notify()
+
+    def _next(self):
+        """Wait for the first deadline and return its timer"""
+        with self._condition:
+            while True:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline, _, run = self._heap[0]
+                if run.stopped.is_set():
+                    heapq.heappop(self._heap)
+                    continue
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    heapq.heappop(self._heap)
+                    return run
+                self._condition.wait(timeout)
+
+    def _schedule(self):
+        while True:
+            run = self._next()
+            run.fire()
+            if not run.stopped.is_set():
+                self.add(run)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2024 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License along with
+#  this program; if not, write to the Free Software Foundation, Inc., 51
+#  Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Cache of the Python code generated from the Qt Designer .ui files.
+
+load_ui_type() is used instead of uic.loadUiType(). The first time a .ui file
+is loaded it is compiled to a Python module in the cache directory, named
+after a hash of the .ui file and the PyQt version. Later it is imported from
+there (using the normal byte-code cache) instead of parsing the XML again. If
+the .ui file changes the hash changes and it is compiled again, and if the
+cache can not be used the .ui file is loaded with uic.loadUiType().
+
+All the .ui files of the client can be compiled in advance with:
+
+    python3 -m cfclient.utils.uicache
+"""
+
+import glob
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import tempfile
+
+from PyQt6 import QtWidgets
+from PyQt6 import uic
+from PyQt6.QtCore import PYQT_VERSION_STR
+from PyQt6.uic.Compiler import compiler
+
+import cfclient
+
+__author__ = 'Bitcraze AB'
+__all__ = ['load_ui_type', 'compile_all']
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(cfclient.config_path, "uicache")
+
+
+def _cache_name(ui_file):
+    with open(ui_file, 'rb') as f:
+        ui_hash = hashlib.sha1(f.read())
+    ui_hash.update(PYQT_VERSION_STR.encode())
+    name = os.path.splitext(os.path.basename(ui_file))[0]
+    return "{}_{}".format(name, ui_hash.hexdigest()[:16])
+
+
+def _compile(ui_file, cache_file):
+    """Compile a .ui file to a Python module in the cache"""
+    code = io.StringIO()
+    winfo = compiler.UICompiler().compileUi(ui_file, code)
+    code.write("\n_UI_CLASS = {!r}\n_BASE_CLASS = {!r}\n".format(
+        winfo["uiclass"], winfo["baseclass"]))
+
+    # Write to a temporary file first so another client starting at the same
+    # time never sees a partial file
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(suffix=".tmp",
+                                    dir=os.path.dirname(cache_file))
+    with os.fdopen(fd, 'w') as f:
+        f.write(code.getvalue())
+    os.replace(tmp_file, cache_file)
+
+    # Remove the modules compiled from older versions of the file
+    prefix = os.path.basename(cache_file).rsplit("_", 1)[0]
+    for old in glob.glob(os.path.join(os.path.dirname(cache_file),
+                                      prefix + "_" + "?" * 16 + ".py")):
+        if old != cache_file:
+            os.remove(old)
+
+
+def _import(cache_name, cache_file):
+    spec = importlib.util.spec_from_file_location(
+        "cfclient_uicache." + cache_name, cache_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # Like uic.loadUiType(), the base class is either a custom class in the
+    # generated module or a QtWidgets class
+    ui_base = getattr(module, module._BASE_CLASS, None)
+    if ui_base is None:
+        ui_base = getattr(QtWidgets, module._BASE_CLASS)
+    return getattr(module, module._UI_CLASS), ui_base
+
+
+def load_ui_type(ui_file):
+    """
+    Load a .ui file and return the generated form class and the Qt base
+    class, like uic.loadUiType()
+    """
+    try:
+        cache_name = _cache_name(ui_file)
+        cache_file = os.path.join(CACHE_DIR, cache_name + ".py")
+        if not os.path.exists(cache_file):
+            logger.debug("Compiling %s to %s", ui_file, cache_file)
+            _compile(ui_file, cache_file)
+        return _import(cache_name, cache_file)
+    except Exception as e:
+        logger.warning("Could not use the ui cache for %s: %s", ui_file, e)
+        return uic.loadUiType(ui_file)
+
+
+def compile_all():
+    """Compile all the .ui files of the client into the cache"""
+    ui_files = glob.glob(os.path.join(cfclient.module_path, "ui", "**",
+                                      "*.ui"), recursive=True)
+    for ui_file in sorted(ui_files):
+        cache_file = os.path.join(CACHE_DIR, _cache_name(ui_file) + ".py")
+        if not os.path.exists(cache_file):
+            _compile(ui_file, cache_file)
+            print("Compiled {}".format(os.path.relpath(ui_file, cfclient.module_path)))
+
+
+if __name__ == '__main__':
+    compile_all()
@@ -28,15 +28,28 @@
 
 """
 Give access to the LED driver memory via ZMQ.
+
+Frames can be streamed faster than they can be written to the Crazyflie. The
+colors are set in the LED memory as they arrive, shared with the LED tab. Only
+one write is in progress at a time and what the memory holds when it is done
+is written next, so the frames received in the meantime are coalesced.
 """
 
 from cflib.crazyflie.mem import MemoryElement
 from cfclient.utils.config import Config
 
+import json
 import logging
+import time
 from threading import Thread, Lock
 
 ZMQ_PULL_PORT = 1024 + 190
+# Number of LEDs in the LED driver memory
+LED_COUNT = 12
+# Time (in seconds) before giving up waiting for a write to finish
+WRITE_TIMEOUT = 1
+# Time (in seconds) between logging the frame rate while streaming
+STATS_PERIOD = 5
 logger = logging.getLogger(__name__)
 
 enabled = False
@@ -67,7 +80,7 @@ class _PullReader(Thread):
     def run(self):
         while True:
             # self.lock.acquire()
-            self._cb(self._receiver.recv_json())
+            self._cb(self._receiver.recv())
 
 
 class ZMQLEDDriver:
@@ -88,20 +101,105 @@ class ZMQLEDDriver:
             self._receiver_thread = _PullReader(self._receiver,
                                                 self._cmd_callback)
 
+            # Accessed both from the reader thread and the write callbacks
+            self._lock = Lock()
+            self._memory = None
+            # Set if there are colors that have not been written yet
+            self._pending = False
+            # When the write in progress was started, None if not writing
+            self._write_started = None
+
+            self._received = 0
+            self._writes = 0
+            self._dropped = 0
+            self._stats_start = time.monotonic()
+            self._stats_writes = 0
+
+            self._cf.mem.mem_write_cb.add_callback(self._write_cb)
+            self._cf.mem.mem_write_failed_cb.add_callback(
+                self._write_failed_cb)
+
     def start(self):
         if enabled:
             self._receiver_thread.start()
 
-    def _cmd_callback(self, data):
+    def stats(self):
+        """Get the number of received, written and dropped frames"""
+        return {"received": self._received, "written": self._writes,
+                "dropped": self._dropped}
+
+    def _decode(self, msg):
+        """
+        Decode a JSON frame, or a binary one with R, G and B bytes for each
+        LED, to a list of (r, g, b) starting at the first LED
+        """
+        if msg[:1] == b"{":
+            leds = json.loads(msg)["rgbleds"]
+        else:
+            leds = [msg[i:i + 3] for i in range(0, len(msg) - 2, 3)]
+        return [(int(r), int(g), int(b)) for r, g, b in leds[:LED_COUNT]]
+
+    def _cmd_callback(self, msg):
         """Called when new data arrives via ZMQ"""
-        if len(self._cf.mem.get_mems(MemoryElement.TYPE_DRIVER_LED)) > 0:
-            logger.info("Updating memory")
-            memory = self._cf.mem.get_mems(MemoryElement.TYPE_DRIVER_LED)[0]
-            for i_led in range(len(data["rgbleds"])):
-                memory.leds[i_led].set(data["rgbleds"][i_led][0],
-                                       data["rgbleds"][i_led][1],
-                                       data["rgbleds"][i_led][2])
-            memory.write_data(self._write_cb)
+        memories = self._cf.mem.get_mems(MemoryElement.TYPE_DRIVER_LED)
+        if len(memories) == 0:
+            return
+        try:
+            leds = self._decode(msg)
+        except Exception as e:
+            logger.warning("Bad LED frame: {}".format(e))
+            return
+
+        with self._lock:
+            if memories[0] is not self._memory:
+                # New connection
+                self._memory = memories[0]
+                self._write_started = None
+            for led, (r, g, b) in zip(self._memory.leds, leds):
+                # Keeps the intensity set in the LED tab
+                led.set(r, g, b)
+            self._received += 1
+            if self._pending:
+                self._dropped += 1
+            self._pending = True
+            if self._write_started is not None and \
+                    time.monotonic() - self._write_started > WRITE_TIMEOUT:
+                logger.warning("LED write timed out")
+                self._write_started = None
+            if self._write_started is None:
+                self._write_next()
+        self._log_stats()
+
+    def _write_next(self):
+        """Write the memory if it has changed, called with the lock held"""
+        if not self._pending:
+            return
+        self._pending = False
+        self._write_started = time.monotonic()
+        self._writes += 1
+        # Written the same way as from the LED tab, the end of the write is
+        # handled by _write_cb()
+        self._memory.write_data(lambda mem, addr: None)
 
     def _write_cb(self, mem, addr):
-        return
+        with self._lock:
+            if mem is self._memory:
+                self._write_started = None
+                self._write_next()
+
+    def _write_failed_cb(self, mem, addr):
+        with self._lock:
+            if mem is self._memory:
+                logger.warning("LED write failed")
+                self._write_started = None
+                self._write_next()
+
+    def _log_stats(self):
+        now = time.monotonic()
+        if now - self._stats_start < STATS_PERIOD:
+            return
+        fps = (self._writes - self._stats_writes) / (now - self._stats_start)
+        logger.info("LED frames: {:.1f} fps written, {} received, {} dropped"
+                    .format(fps, self._received, self._dropped))
+        self._stats_start = now
+        self._stats_writes = self._writes
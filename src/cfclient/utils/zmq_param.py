@@ -28,14 +28,26 @@
 
 """
 Give access to the parameter framework via ZMQ.
+
+The socket is a ROUTER socket so many parameter writes can be in progress at
+the same time, from one or several clients. Each write is answered when the
+Crazyflie echoes the parameter back, or when it times out.
 """
 
+import json
 import logging
-from threading import Thread, Lock
+import queue
+import time
+from socket import socketpair
+from threading import Lock, Thread
 
 from cfclient.utils.config import Config
 
 ZMQ_PULL_PORT = 1024 + 189
+# Timeout (in seconds) before giving up waiting for a parameter echo
+PARAM_TIMEOUT = 2
+# Max time (in ms) between checks for timed out writes
+TIMEOUT_CHECK_PERIOD = 100
 logger = logging.getLogger(__name__)
 
 enabled = False
@@ -52,6 +64,15 @@ if not Config().get("enable_zmq_param"):
     logger.info("ZMQ param disabled in config file")
 
 
+class _PendingSet:
+    """A set command waiting for the parameter to be echoed back"""
+
+    def __init__(self, envelope, response):
+        self.envelope = envelope
+        self.response = response
+        self.deadline = time.monotonic() + PARAM_TIMEOUT
+
+
 class _PullReader(Thread):
 
     def __init__(self, receiver, callback, *args):
@@ -59,12 +80,49 @@ class _PullReader(Thread):
         self._receiver = receiver
         self._cb = callback
         self.daemon = True
-        self.lock = Lock()
+        # Responses are sent from this thread only since ZMQ sockets are not
+        # thread safe, the socket pair is used to wake up the thread
+        self._responses = queue.Queue()
+        self._wakeup_receiver, self._wakeup_sender = socketpair()
+        self.check_timeouts = None
+
+    def respond(self, envelope, response):
+        """Queue a response, can be called from any thread"""
+        self._responses.put((envelope, response))
+        self._wakeup_sender.send(b"\0")
 
     def run(self):
+        poller = zmq.Poller()
+        poller.register(self._receiver, zmq.POLLIN)
+        poller.register(self._wakeup_receiver, zmq.POLLIN)
         while True:
-            self.lock.acquire()
-            self._cb(self._receiver.recv_json())
+            events = dict(poller.poll(TIMEOUT_CHECK_PERIOD))
+            if self._receiver in events:
+                # The last frame is the command, what is before it is used
+                # to route the response back to the client
+                frames = self._receiver.recv_multipart()
+                try:
+                    self._cb(frames[:-1], json.loads(frames[-1]))
+                except KeyError as e:
+                    logger.warning("Bad ZMQ param command: {}".format(e))
+                    self.respond(frames[:-1], {
+                        "version": 1, "status": 0xFF,
+                        "msg": "Missing field {}".format(e)})
+                except Exception as e:
+                    # Always answer, or a REQ client would wait forever
+                    logger.warning("Bad ZMQ param command: {}".format(e))
+                    self.respond(frames[:-1], {
+                        "version": 1, "status": 0xFF,
+                        "msg": "Bad command: {}".format(e)})
+            if self._wakeup_receiver.fileno() in events:
+                self._wakeup_receiver.recv(4096)
+
+            if self.check_timeouts:
+                self.check_timeouts()
+            while not self._responses.empty():
+                envelope, response = self._responses.get()
+                self._receiver.send_multipart(
+                    envelope + [json.dumps(response).encode("utf-8")])
 
 
 class ZMQParamAccess:
@@ -74,8 +132,13 @@ class ZMQParamAccess:
 
         if enabled:
             self._cf = crazyflie
+            # Set commands waiting for an echo, keyed by parameter name. The
+            # echos are matched with the oldest command for the parameter.
+            # Accessed both from the reader thread and the param callback.
+            self._pending = {}
+            self._lock = Lock()
             context = zmq.Context()
-            self._receiver = context.socket(zmq.REP)
+            self._receiver = context.socket(zmq.ROUTER)
             self._bind_addr = "tcp://*:{}".format(ZMQ_PULL_PORT)
             # If the port is already bound an exception will be thrown
             # and caught in the initialization of the readers and handled.
@@ -84,32 +147,105 @@ class ZMQParamAccess:
                 "Biding ZMQ for parameters at {}".format(self._bind_addr))
             self._receiver_thread = _PullReader(self._receiver,
                                                 self._cmd_callback)
+            self._receiver_thread.check_timeouts = self._check_timeouts
+            self._cf.param.all_update_callback.add_callback(
+                self._param_callback)
 
     def start(self):
         if enabled:
             self._receiver_thread.start()
 
-    def _cmd_callback(self, data):
+    def _toc(self):
+        toc = {}
+        param_toc = self._cf.param.toc.toc
+        values = self._cf.param.values
+        for group in param_toc:
+            toc[group] = {}
+            for name in param_toc[group]:
+                element = param_toc[group][name]
+                toc[group][name] = {
+                    "type": element.ctype,
+                    "access": "RW" if element.access == 0 else "RO",
+                    "value": values.get(group, {}).get(name)}
+        return toc
+
+    def _cmd_callback(self, envelope, data):
         # logger.info(data)
+        response = {"version": 1, "cmd": data["cmd"]}
+        # Clients sending several commands at once can add an id to them to
+        # know what command a response belongs to
+        if "id" in data:
+            response["id"] = data["id"]
+
         if data["cmd"] == "toc":
-            response = {"version": 1, "toc": []}
-            self._receiver.send_json(response)
-            self._receiver_thread.lock.release()
-        if data["cmd"] == "set":
-            resp = {"version": 1}  # noqa
-            group = data["name"].split(".")[0]
-            name = data["name"].split(".")[1]
-            self._cf.param.add_update_callback(group=group, name=name,
-                                               cb=self._param_callback)
-            self._cf.param.set_value(data["name"], str(data["value"]))
+            response["status"] = 0
+            response["toc"] = self._toc()
+        elif data["cmd"] == "set" and not (self._cf.is_connected() and
+                                           self._cf.param.is_updated):
+            # Setting a parameter blocks until the Crazyflie is fully
+            # connected, which would stop the handling of other commands
+            response["name"] = data["name"]
+            response["status"] = 5
+            response["msg"] = "Not connected, can not set parameter " \
+                              "{}".format(data["name"])
+        elif data["cmd"] == "set":
+            response["name"] = data["name"]
+            value = str(data["value"])
+            pending = _PendingSet(envelope, response)
+            with self._lock:
+                self._pending.setdefault(data["name"], []).append(pending)
+            try:
+                self._cf.param.set_value(data["name"], value)
+                return
+            except KeyError as e:
+                response["status"] = 1
+                response["msg"] = str(e)
+            except AttributeError as e:
+                response["status"] = 2
+                response["msg"] = str(e)
+            except Exception as e:
+                response["status"] = 6
+                response["msg"] = "Could not set parameter " \
+                                  "{}: {}".format(data["name"], e)
+            self._remove_pending(data["name"], pending)
+        else:
+            response["status"] = 0xFF
+            response["msg"] = "Unknown command {}".format(data["cmd"])
+        self._receiver_thread.respond(envelope, response)
+
+    def _remove_pending(self, name, pending):
+        with self._lock:
+            waiting = self._pending.get(name, [])
+            if pending in waiting:
+                waiting.remove(pending)
+            if not waiting:
+                self._pending.pop(name, None)
+
+    def _check_timeouts(self):
+        now = time.monotonic()
+        timed_out = []
+        with self._lock:
+            for name in list(self._pending):
+                waiting = self._pending[name]
+                timed_out += [(name, p) for p in waiting
+                              if p.deadline <= now]
+                waiting[:] = [p for p in waiting if p.deadline > now]
+                if not waiting:
+                    del self._pending[name]
+        for name, pending in timed_out:
+            pending.response["status"] = 3
+            pending.response["msg"] = "Timeout when setting " \
+                                      "parameter {}".format(name)
+            self._receiver_thread.respond(pending.envelope, pending.response)
 
     def _param_callback(self, name, value):
-        group = name.split(".")[0]
-        name_short = name.split(".")[1]
-        logger.info("Removing {}.{}".format(group, name_short))
-        self._cf.param.remove_update_callback(group=group, name=name_short,
-                                              cb=self._param_callback)
-
-        response = {"version": 1, "cmd": "set", "name": name, "value": value}
-        self._receiver.send_json(response)
-        self._receiver_thread.lock.release()
+        with self._lock:
+            waiting = self._pending.get(name)
+            if not waiting:
+                return
+            pending = waiting.pop(0)
+            if not waiting:
+                del self._pending[name]
+        pending.response["status"] = 0
+        pending.response["value"] = value
+        self._receiver_thread.respond(pending.envelope, pending.response)
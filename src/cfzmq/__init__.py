@@ -31,14 +31,20 @@ Server used to connect to a Crazyflie using ZMQ.
 
 import sys
 import os
+import json
 import logging
 import signal
+import struct
+import time
 import zmq
 import queue
-from threading import Thread
+from functools import partial
+from threading import Lock, Thread
+from socket import socketpair
 import cflib.crtp
 from cflib.crazyflie import Crazyflie
 from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.log import LogTocElement
 
 import cfclient
 
@@ -65,73 +71,195 @@ ZMQ_CTRL_PORT = 4
 
 # Timeout before giving up when verifying param write
 PARAM_TIMEOUT = 2
-# Timeout before giving up connection
+# Timeout before giving up connection, if the Crazyflie does not answer
 CONNECT_TIMEOUT = 5
 # Timeout before giving up adding/starting log config
 LOG_TIMEOUT = 10
+# Max time (in ms) between checks for timed out commands
+TIMEOUT_CHECK_PERIOD = 100
+# Rate (in Hz) that control set-points are sent to the Crazyflie
+CTRL_RATE = 100
+# Time (in ms) without new set-points before the motors are stopped
+CTRL_TIMEOUT = 500
+# Binary control set-point: roll, pitch, yaw (float) and thrust (uint16)
+CTRL_STRUCT = struct.Struct("<fffH")
+
+# Encodings of log data that can be requested when creating a log config
+LOG_ENCODING_JSON = "json"
+LOG_ENCODING_BINARY = "binary"
 
 logger = logging.getLogger(__name__)
 
 
-class _SrvThread(Thread):
+class _Request:
+    """
+    A command from a client. The response is sent when all the things the
+    command waits for (i.e parameter echos or log config events) are done.
+    """
+
+    def __init__(self, envelope, cmd):
+        self.envelope = envelope
+        self.response = {"version": 1}
+        # Clients sending several commands at once can add an id to them to
+        # know what command a response belongs to
+        if "id" in cmd:
+            self.response["id"] = cmd["id"]
+        # Count the command itself, so it is not answered before it has
+        # been handled even if what it waits for is done right away
+        self.waiting = 1
+        # Called right before the response is sent
+        self.on_finished = None
+
+
+class _Waiter:
+    """Something a request is waiting for"""
+
+    def __init__(self, request, timeout, on_done, on_timeout):
+        self.request = request
+        self.deadline = None
+        if timeout:
+            self.deadline = time.monotonic() + timeout
+        self.on_done = on_done
+        self.on_timeout = on_timeout
+
+
+class _Link:
+    """A Crazyflie handled by the server and its log configurations"""
+
+    def __init__(self, uri, cf):
+        self.uri = uri
+        self.cf = cf
+        self.logging_configs = {}
+        # Packers for the log configs using binary encoding
+        self.log_structs = {}
+        self.log_batches = {}
+        self.log_batch_start = {}
+        # The batches are filled from the Crazyflie thread and sent from
+        # there or from the server thread when they are too old
+        self.log_batch_lock = Lock()
+
 
-    def __init__(self, socket, log_socket, param_socket, conn_socket, cf,
+class _SrvThread(Thread):
+    """
+    Thread handling the commands from the clients. The command socket is a
+    ROUTER socket so several clients can have commands in progress at the
+    same time. Commands that need to wait for the Crazyflie register what
+    they are waiting for and are answered from the callbacks, so the thread
+    never blocks on a single command.
+
+    In swarm mode there is one Crazyflie per URI, the commands are routed
+    using their uri field and everything published is prefixed with the URI
+    of the Crazyflie it comes from so clients can subscribe to one of them.
+    """
+
+    def __init__(self, socket, log_socket, param_socket, conn_socket,
+                 create_cf, log_batch_size=1, log_batch_time=0, swarm=False,
                  *args):
         super(_SrvThread, self).__init__(*args)
         self._socket = socket
         self._log_socket = log_socket
         self._param_socket = param_socket
         self._conn_socket = conn_socket
-        self._cf = cf
-
-        self._cf.connected.add_callback(self._connected)
-        self._cf.connection_failed.add_callback(self._connection_failed)
-        self._cf.connection_lost.add_callback(self._connection_lost)
-        self._cf.disconnected.add_callback(self._disconnected)
-        self._cf.connection_requested.add_callback(self._connection_requested)
-        self._cf.param.all_updated.add_callback(self._tocs_updated)
-        self._cf.param.all_update_callback.add_callback(self._all_param_update)
-
-        self._conn_queue = queue.Queue(1)
-        self._param_queue = queue.Queue(1)
-        self._log_started_queue = queue.Queue(1)
-        self._log_added_queue = queue.Queue(1)
-
-        self._logging_configs = {}
-
-    def _connection_requested(self, uri):
+        self._create_cf = create_cf
+        self._swarm = swarm
+
+        # Requests waiting for something to happen, keyed by what they are
+        # waiting for. Accessed both from this thread and the callbacks.
+        self._waiters = {}
+        self._lock = Lock()
+        # Responses are sent from this thread only since ZMQ sockets are not
+        # thread safe, the socket pair is used to wake up the thread
+        self._responses = queue.Queue()
+        self._wakeup_receiver, self._wakeup_sender = socketpair()
+        # Each Crazyflie calls back from its own thread, so publishing has
+        # to be serialized
+        self._pub_lock = Lock()
+
+        # Log data is sent in batches of log_batch_size samples, or when the
+        # first sample in the batch is log_batch_time ms old. A size of 0
+        # means that only the time is used.
+        self._log_batch_size = log_batch_size
+        self._log_batch_time = log_batch_time / 1000.0
+        self._log_batching = log_batch_size != 1 and (
+            log_batch_size > 0 or log_batch_time > 0)
+
+        # Links keyed by URI, without swarm mode there is only one that is
+        # used for all the URIs
+        self._links = {}
+        if not self._swarm:
+            self._add_link(None)
+
+    def _add_link(self, uri):
+        link = _Link(uri, self._create_cf())
+        cf = link.cf
+        cf.connected.add_callback(partial(self._connected, link))
+        cf.connection_failed.add_callback(
+            partial(self._connection_failed, link))
+        cf.connection_lost.add_callback(partial(self._connection_lost, link))
+        cf.disconnected.add_callback(partial(self._disconnected, link))
+        cf.connection_requested.add_callback(
+            partial(self._connection_requested, link))
+        cf.param.all_updated.add_callback(partial(self._tocs_updated, link))
+        cf.param.all_update_callback.add_callback(
+            partial(self._all_param_update, link))
+        self._links[uri] = link
+        return link
+
+    def get_link(self, uri):
+        """Get the link used for uri, None if there is no such link"""
+        if not self._swarm:
+            return self._links[None]
+        return self._links.get(uri)
+
+    def _publish(self, socket, link, frames):
+        """Publish frames, prefixed with the URI of the link in swarm mode"""
+        if self._swarm:
+            frames = [link.uri.encode("utf-8")] + frames
+        with self._pub_lock:
+            socket.send_multipart(frames)
+
+    def _publish_json(self, socket, link, msg):
+        if self._swarm:
+            msg["uri"] = link.uri
+        self._publish(socket, link, [json.dumps(msg).encode("utf-8")])
+
+    def _connection_requested(self, link, uri):
         conn_ev = {"version": 1, "event": "requested", "uri": uri}
-        self._conn_socket.send_json(conn_ev)
+        self._publish_json(self._conn_socket, link, conn_ev)
 
-    def _connected(self, uri):
+    def _connected(self, link, uri):
+        # The Crazyflie answers, from now on it is up to cflib to fail the
+        # connection if the TOCs can not be downloaded
+        self._clear_deadlines(("connect", link))
         conn_ev = {"version": 1, "event": "connected", "uri": uri}
-        self._conn_socket.send_json(conn_ev)
+        self._publish_json(self._conn_socket, link, conn_ev)
 
-    def _connection_failed(self, uri, msg):
+    def _connection_failed(self, link, uri, msg):
         logger.info("Connection failed to {}: {}".format(uri, msg))
-        resp = {"version": 1, "status": 1, "msg": msg}
-        self._conn_queue.put_nowait(resp)
+        self._done(("connect", link), {"status": 1, "msg": msg},
+                   all_waiters=True)
         conn_ev = {"version": 1, "event": "failed", "uri": uri, "msg": msg}
-        self._conn_socket.send_json(conn_ev)
+        self._publish_json(self._conn_socket, link, conn_ev)
 
-    def _connection_lost(self, uri, msg):
+    def _connection_lost(self, link, uri, msg):
         conn_ev = {"version": 1, "event": "lost", "uri": uri, "msg": msg}
-        self._conn_socket.send_json(conn_ev)
+        self._publish_json(self._conn_socket, link, conn_ev)
 
-    def _disconnected(self, uri):
+    def _disconnected(self, link, uri):
         conn_ev = {"version": 1, "event": "disconnected", "uri": uri}
-        self._conn_socket.send_json(conn_ev)
+        self._publish_json(self._conn_socket, link, conn_ev)
 
-    def _tocs_updated(self):
+    def _tocs_updated(self, link):
+        cf = link.cf
         # First do the log
-        log_toc = self._cf.log.toc.toc
+        log_toc = cf.log.toc.toc
         log = {}
         for group in log_toc:
             log[group] = {}
             for name in log_toc[group]:
                 log[group][name] = {"type": log_toc[group][name].ctype}
         # The the params
-        param_toc = self._cf.param.toc.toc
+        param_toc = cf.param.toc.toc
         param = {}
         for group in param_toc:
             param[group] = {}
@@ -140,195 +268,508 @@ class _SrvThread(Thread):
                     "type": param_toc[group][name].ctype,
                     "access": "RW" if param_toc[group][
                         name].access == 0 else "RO",
-                    "value": self._cf.param.values[group][name]}
-
-        resp = {"version": 1, "status": 0, "log": log, "param": param}
-        self._conn_queue.put_nowait(resp)
-
-    def _handle_scanning(self):
-        resp = {"version": 1}
-        interfaces = cflib.crtp.scan_interfaces()
-        resp["interfaces"] = []
-        for i in interfaces:
-            resp["interfaces"].append({"uri": i[0], "info": i[1]})
-        return resp
-
-    def _handle_connect(self, uri):
-        self._cf.open_link(uri)
-        return self._conn_queue.get(block=True)
-
-    def _logging_started(self, conf, started):
+                    "value": cf.param.values[group][name]}
+
+        self._done(("connect", link),
+                   {"status": 0, "log": log, "param": param},
+                   all_waiters=True)
+
+    def _respond(self, request):
+        """Queue the response to a request, can be called from any thread"""
+        self._responses.put(request)
+        self._wakeup_sender.send(b"\0")
+
+    def _wait(self, request, key, timeout, on_done, on_timeout=None):
+        """
+        Make the request wait for key to be done. on_done is called with the
+        request and the value from _done(), on_timeout with the request if
+        the timeout (in seconds, None for no timeout) is hit before that.
+        Returns True if nothing was waiting for key before.
+        """
+        with self._lock:
+            request.waiting += 1
+            waiters = self._waiters.setdefault(key, [])
+            waiters.append(_Waiter(request, timeout, on_done, on_timeout))
+            return len(waiters) == 1
+
+    def _done(self, key, value, all_waiters=False):
+        """
+        Something has happened that requests can wait for, finish the oldest
+        request waiting for it (or all of them)
+        """
+        with self._lock:
+            waiters = self._waiters.pop(key, [])
+            if not all_waiters and len(waiters) > 1:
+                self._waiters[key] = waiters[1:]
+                waiters = waiters[:1]
+        for waiter in waiters:
+            waiter.on_done(waiter.request, value)
+            self._finish(waiter.request)
+
+    def _cancel(self, request, key=None):
+        """
+        Stop waiting for key (or everything if key is None), if the request
+        could not be started
+        """
+        with self._lock:
+            keys = [key] if key is not None else list(self._waiters)
+            for k in keys:
+                waiters = self._waiters.get(k, [])
+                for waiter in [w for w in waiters if w.request is request]:
+                    waiters.remove(waiter)
+                    request.waiting -= 1
+                if not waiters:
+                    self._waiters.pop(k, None)
+
+    def _clear_deadlines(self, key):
+        """Stop the timeouts of the requests waiting for key"""
+        with self._lock:
+            for waiter in self._waiters.get(key, []):
+                waiter.deadline = None
+
+    def _finish(self, request):
+        with self._lock:
+            request.waiting -= 1
+            finished = request.waiting == 0
+        if finished:
+            if request.on_finished:
+                request.on_finished(request)
+            self._respond(request)
+
+    def _check_timeouts(self):
+        now = time.monotonic()
+        timed_out = []
+        with self._lock:
+            for key in list(self._waiters):
+                waiters = self._waiters[key]
+                timed_out += [w for w in waiters
+                              if w.deadline and w.deadline <= now]
+                waiters[:] = [w for w in waiters
+                              if not w.deadline or w.deadline > now]
+                if not waiters:
+                    del self._waiters[key]
+        for waiter in timed_out:
+            waiter.on_timeout(waiter.request)
+            self._finish(waiter.request)
+
+    def _handle_scanning(self, request):
+        def scan_done(request, interfaces):
+            request.response["interfaces"] = []
+            for i in interfaces:
+                request.response["interfaces"].append(
+                    {"uri": i[0], "info": i[1]})
+
+        # Scanning takes a while, so do it in the background and answer all
+        # the scan commands that arrive in the meantime with the result
+        if self._wait(request, "scan", None, scan_done):
+            scanner = Thread(target=lambda: self._done(
+                "scan", cflib.crtp.scan_interfaces(), all_waiters=True))
+            scanner.daemon = True
+            scanner.start()
+
+    def _handle_connect(self, request, uri):
+        def connect_done(request, resp):
+            request.response.update(resp)
+
+        def connect_timeout(request):
+            request.response["status"] = 1
+            request.response["msg"] = "Timeout when connecting to " \
+                                      "{}".format(uri)
+            link.cf.close_link()
+
+        # Crazyflies are kept after they are disconnected so the same one
+        # is used if the URI is connected again
+        link = self.get_link(uri) or self._add_link(uri)
+        self._wait(request, ("connect", link), CONNECT_TIMEOUT, connect_done,
+                   connect_timeout)
+        link.cf.open_link(uri)
+
+    def _logging_started(self, link, conf, started):
         out = {"version": 1, "name": conf.name}
         if started:
             out["event"] = "started"
         else:
             out["event"] = "stopped"
-        self._log_socket.send_json(out)
-        self._log_started_queue.put_nowait(started)
+            self._send_log_batch(link, conf)
+        self._publish_json(self._log_socket, link, out)
+        self._done(("log_started", link, conf.name), started)
 
-    def _logging_added(self, conf, added):
+    def _logging_added(self, link, conf, added):
         out = {"version": 1, "name": conf.name}
         if added:
             out["event"] = "created"
+            if conf.name in link.log_structs:
+                # Send the layout once, the data is only the values
+                out["encoding"] = LOG_ENCODING_BINARY
+                out["variables"] = [v.name for v in conf.variables]
+                out["types"] = [
+                    LogTocElement.get_cstring_from_id(v.fetch_as)
+                    for v in conf.variables]
+                out["format"] = link.log_structs[conf.name].format
         else:
             out["event"] = "deleted"
-        self._log_socket.send_json(out)
-        self._log_added_queue.put_nowait(added)
+            self._send_log_batch(link, conf)
+        self._publish_json(self._log_socket, link, out)
+        self._done(("log_added", link, conf.name), added)
+
+    def _handle_logging(self, request, link, data):
+        resp = request.response
+
+        def log_done(request, value):
+            request.response["status"] = 0
+
+        def log_timeout(status, msg):
+            def on_timeout(request):
+                request.response["status"] = status
+                request.response["msg"] = msg
+            return on_timeout
 
-    def _handle_logging(self, data):
-        resp = {"version": 1}
         if data["action"] == "create":
             lg = LogConfig(data["name"], data["period"])
             for v in data["variables"]:
                 lg.add_variable(v)
-            lg.started_cb.add_callback(self._logging_started)
-            lg.added_cb.add_callback(self._logging_added)
+            lg.started_cb.add_callback(partial(self._logging_started, link))
+            lg.added_cb.add_callback(partial(self._logging_added, link))
+            encoding = data.get("encoding", LOG_ENCODING_JSON)
+            key = ("log_added", link, data["name"])
             try:
-                lg.data_received_cb.add_callback(self._logdata_callback)
-                self._logging_configs[data["name"]] = lg
-                self._cf.log.add_config(lg)
+                if encoding not in (LOG_ENCODING_JSON, LOG_ENCODING_BINARY):
+                    raise ValueError("Unknown encoding {}".format(encoding))
+                link.logging_configs[data["name"]] = lg
+                link.log_structs.pop(data["name"], None)
+                link.cf.log.add_config(lg)
+                if encoding == LOG_ENCODING_BINARY:
+                    # The types are known once the config has been added
+                    link.log_structs[data["name"]] = struct.Struct(
+                        "<I" + "".join(
+                            LogTocElement.get_unpack_string_from_id(
+                                v.fetch_as)[1:] for v in lg.variables))
+                lg.data_received_cb.add_callback(
+                    partial(self._logdata_callback, link))
+                self._wait(request, key, LOG_TIMEOUT, log_done, log_timeout(
+                    3, "Log configuration did not start"))
                 lg.create()
-                self._log_added_queue.get(block=True, timeout=LOG_TIMEOUT)
-                resp["status"] = 0
             except KeyError as e:
                 resp["status"] = 1
                 resp["msg"] = str(e)
             except AttributeError as e:
                 resp["status"] = 2
                 resp["msg"] = str(e)
-            except queue.Empty:
-                resp["status"] = 3
-                resp["msg"] = "Log configuration did not start"
-        if data["action"] == "start":
-            try:
-                self._logging_configs[data["name"]].start()
-                self._log_started_queue.get(block=True, timeout=LOG_TIMEOUT)
-                resp["status"] = 0
-            except KeyError as e:
-                resp["status"] = 1
-                resp["msg"] = "{} config not found".format(str(e))
-            except queue.Empty:
-                resp["status"] = 2
-                resp["msg"] = "Log configuration did not stop"
-        if data["action"] == "stop":
-            try:
-                self._logging_configs[data["name"]].stop()
-                self._log_started_queue.get(block=True, timeout=LOG_TIMEOUT)
-                resp["status"] = 0
-            except KeyError as e:
-                resp["status"] = 1
-                resp["msg"] = "{} config not found".format(str(e))
-            except queue.Empty:
-                resp["status"] = 2
-                resp["msg"] = "Log configuration did not stop"
-        if data["action"] == "delete":
+            except ValueError as e:
+                resp["status"] = 4
+                resp["msg"] = str(e)
+        elif data["action"] in ("start", "stop", "delete"):
+            if data["action"] == "delete":
+                key = ("log_added", link, data["name"])
+            else:
+                key = ("log_started", link, data["name"])
             try:
-                self._logging_configs[data["name"]].delete()
-                self._log_added_queue.get(block=True, timeout=LOG_TIMEOUT)
-                resp["status"] = 0
+                lg = link.logging_configs[data["name"]]
+                self._wait(request, key, LOG_TIMEOUT, log_done, log_timeout(
+                    2, "Log configuration did not {}".format(data["action"])))
+                getattr(lg, data["action"])()
             except KeyError as e:
                 resp["status"] = 1
                 resp["msg"] = "{} config not found".format(str(e))
-            except queue.Empty:
-                resp["status"] = 2
-                resp["msg"] = "Log configuration did not stop"
-
-        return resp
 
-    def _handle_param(self, data):
-        resp = {"version": 1}
-        group = data["name"].split(".")[0]
-        name = data["name"].split(".")[1]
-        self._cf.param.add_update_callback(group=group, name=name,
-                                           cb=self._param_callback)
+    def _handle_param(self, request, link, data):
+        if "params" not in data:
+            self._set_param(request, link, data["name"], data["value"],
+                            request.response)
+            return
+
+        # Several parameters at once, all the values are sent directly and
+        # the response is sent when all of them are echoed or timed out
+        def batch_finished(request):
+            failed = [r["name"] for r in results if r["status"] != 0]
+            if failed:
+                request.response["status"] = 4
+                request.response["msg"] = "Could not set parameters " \
+                                          "{}".format(", ".join(failed))
+            else:
+                request.response["status"] = 0
+
+        results = []
+        request.response["params"] = results
+        request.on_finished = batch_finished
+        for param in data["params"]:
+            result = {"name": param["name"]}
+            results.append(result)
+            self._set_param(request, link, param["name"], param["value"],
+                            result)
+
+    def _set_param(self, request, link, name, value, result):
+        """Set a parameter, putting the outcome in the result dict"""
+        def param_done(request, value):
+            result["name"] = name
+            result["value"] = value
+            result["status"] = 0
+
+        def param_timeout(request):
+            result["status"] = 3
+            result["msg"] = "Timeout when setting parameter" \
+                            "{}".format(name)
+
+        # Setting a parameter blocks until the Crazyflie is fully connected,
+        # which would stop the handling of all the other commands
+        if not link.cf.param.is_updated:
+            result["status"] = 5
+            result["msg"] = "Not connected, can not set parameter " \
+                            "{}".format(name)
+            return
+
+        # Wait for the value to be echoed back by the Crazyflie
+        key = ("param", link, name)
+        self._wait(request, key, PARAM_TIMEOUT, param_done, param_timeout)
         try:
-            self._cf.param.set_value(data["name"], str(data["value"]))
-            answer = self._param_queue.get(block=True, timeout=PARAM_TIMEOUT)
-            resp["name"] = answer["name"]
-            resp["value"] = answer["value"]
-            resp["status"] = 0
+            link.cf.param.set_value(name, str(value))
         except KeyError as e:
-            resp["status"] = 1
-            resp["msg"] = str(e)
+            self._cancel(request, key)
+            result["status"] = 1
+            result["msg"] = str(e)
         except AttributeError as e:
-            resp["status"] = 2
-            resp["msg"] = str(e)
-        except queue.Empty:
-            resp["status"] = 3
-            resp["msg"] = "Timeout when setting parameter" \
-                          "{}".format(data["name"])
-        return resp
-
-    def _all_param_update(self, name, value):
+            self._cancel(request, key)
+            result["status"] = 2
+            result["msg"] = str(e)
+        except Exception as e:
+            self._cancel(request, key)
+            result["status"] = 6
+            result["msg"] = "Could not set parameter {}: {}".format(name, e)
+
+    def _all_param_update(self, link, name, value):
         resp = {"version": 1, "name": name, "value": value}
-        self._param_socket.send_json(resp)
-
-    def _param_callback(self, name, value):
-        group = name.split(".")[0]
-        name_short = name.split(".")[1]
-        self._cf.param.remove_update_callback(group=group, name=name_short)
-        self._param_queue.put_nowait({"name": name, "value": value})
-
-    def _logdata_callback(self, ts, data, conf):
-        out = {"version": 1, "name": conf.name, "event": "data",
-               "timestamp": ts, "variables": {}}
-        for d in data:
-            out["variables"][d] = data[d]
-        self._log_socket.send_json(out)
+        self._publish_json(self._param_socket, link, resp)
+        self._done(("param", link, name), value)
+
+    def _logdata_callback(self, link, ts, data, conf):
+        if not self._log_batching:
+            self._send_log_data(link, conf, [(ts, data)])
+            return
+
+        with link.log_batch_lock:
+            batch = link.log_batches.setdefault(conf.name, [])
+            if not batch:
+                link.log_batch_start[conf.name] = time.monotonic()
+            batch.append((ts, data))
+            full = len(batch) == self._log_batch_size
+        if full or self._log_batch_due(link, conf.name, time.monotonic()):
+            self._send_log_batch(link, conf)
+
+    def _log_batch_due(self, link, name, now):
+        return (self._log_batch_time and name in link.log_batches and
+                now - link.log_batch_start[name] >= self._log_batch_time)
+
+    def _send_log_batch(self, link, conf):
+        with link.log_batch_lock:
+            batch = link.log_batches.pop(conf.name, None)
+        if batch:
+            self._send_log_data(link, conf, batch)
+
+    def _send_due_log_batches(self):
+        """
+        Send the batches that are too old, so the last samples of a log
+        config that is slow or has stopped are not held back
+        """
+        now = time.monotonic()
+        for link in list(self._links.values()):
+            for name in list(link.log_batches):
+                conf = link.logging_configs.get(name)
+                if conf and self._log_batch_due(link, name, now):
+                    self._send_log_batch(link, conf)
+
+    def _send_log_data(self, link, conf, samples):
+        if conf.name in link.log_structs:
+            pack = link.log_structs[conf.name].pack
+            values = b"".join([pack(ts, *data.values())
+                               for ts, data in samples])
+            self._publish(self._log_socket, link,
+                          [conf.name.encode("utf-8"), values])
+        elif self._log_batching:
+            out = {"version": 1, "name": conf.name, "event": "batch",
+                   "timestamps": [ts for ts, _ in samples], "variables": {}}
+            for d in samples[0][1]:
+                out["variables"][d] = [data[d] for _, data in samples]
+            self._publish_json(self._log_socket, link, out)
+        else:
+            ts, data = samples[0]
+            out = {"version": 1, "name": conf.name, "event": "data",
+                   "timestamp": ts, "variables": {}}
+            for d in data:
+                out["variables"][d] = data[d]
+            self._publish_json(self._log_socket, link, out)
+
+    def _handle_command(self, envelope, cmd):
+        request = _Request(envelope, cmd)
+        logger.info("Got command {}".format(cmd))
+        try:
+            self._dispatch_command(request, cmd)
+        except Exception as e:
+            # A bad command or a failing Crazyflie must not stop the server
+            logger.exception("Error when handling command {}".format(cmd))
+            self._cancel(request)
+            request.response["status"] = 0xFD
+            request.response["msg"] = "Error when handling command: " \
+                                      "{}".format(e)
+        self._finish(request)
+
+    def _dispatch_command(self, request, cmd):
+        if cmd["cmd"] == "scan":
+            self._handle_scanning(request)
+        elif cmd["cmd"] == "connect":
+            self._handle_connect(request, cmd["uri"])
+        elif cmd["cmd"] in ("disconnect", "log", "param"):
+            link = self.get_link(cmd.get("uri"))
+            if link is None:
+                request.response["status"] = 0xFE
+                request.response["msg"] = "No Crazyflie with uri " \
+                                          "{}".format(cmd.get("uri"))
+            elif cmd["cmd"] == "disconnect":
+                link.cf.close_link()
+                request.response["status"] = 0
+            elif cmd["cmd"] == "log":
+                self._handle_logging(request, link, cmd)
+            else:
+                self._handle_param(request, link, cmd)
+        else:
+            request.response["status"] = 0xFF
+            request.response["msg"] = "Unknown command {}".format(cmd["cmd"])
 
     def run(self):
         logger.info("Starting server thread")
+        poller = zmq.Poller()
+        poller.register(self._socket, zmq.POLLIN)
+        poller.register(self._wakeup_receiver, zmq.POLLIN)
+        poll_timeout = TIMEOUT_CHECK_PERIOD
+        if self._log_batch_time:
+            poll_timeout = min(poll_timeout, self._log_batch_time * 1000)
         while True:
-            # Wait for the command
-            cmd = self._socket.recv_json()
-            response = {"version": 1}
-            logger.info("Got command {}".format(cmd))
-            if cmd["cmd"] == "scan":
-                response = self._handle_scanning()
-            elif cmd["cmd"] == "connect":
-                response = self._handle_connect(cmd["uri"])
-            elif cmd["cmd"] == "disconnect":
-                self._cf.close_link()
-                response["status"] = 0
-            elif cmd["cmd"] == "log":
-                response = self._handle_logging(cmd)
-            elif cmd["cmd"] == "param":
-                response = self._handle_param(cmd)
-            else:
-                response["status"] = 0xFF
-                response["msg"] = "Unknown command {}".format(cmd["cmd"])
-            self._socket.send_json(response)
+            events = dict(poller.poll(poll_timeout))
+            if self._socket in events:
+                # The last frame is the command, what is before it is used
+                # to route the response back to the client
+                frames = self._socket.recv_multipart()
+                try:
+                    cmd = json.loads(frames[-1])
+                except ValueError as e:
+                    logger.warning("Bad command: {}".format(e))
+                    cmd = None
+                if not isinstance(cmd, dict):
+                    cmd = {"cmd": None}
+                self._handle_command(frames[:-1], cmd)
+            if self._wakeup_receiver.fileno() in events:
+                self._wakeup_receiver.recv(4096)
+
+            self._check_timeouts()
+            if self._log_batching:
+                self._send_due_log_batches()
+            while not self._responses.empty():
+                request = self._responses.get()
+                self._socket.send_multipart(
+                    request.envelope +
+                    [json.dumps(request.response).encode("utf-8")])
 
 
 class _CtrlThread(Thread):
-
-    def __init__(self, socket, cf, *args):
+    """
+    Thread sending control set-points to the Crazyflies. Only the latest
+    set-point received from the clients is kept and it is sent at a fixed
+    rate, no matter how fast or slow the clients are sending. If no new
+    set-point is received within the timeout the motors are stopped.
+
+    In swarm mode each Crazyflie has its own set-point, selected by the uri
+    field of JSON set-points or a first frame with the URI for binary ones.
+    """
+
+    def __init__(self, socket, get_link, rate=CTRL_RATE,
+                 timeout=CTRL_TIMEOUT, swarm=False, *args):
         super(_CtrlThread, self).__init__(*args)
         self._socket = socket
-        self._cf = cf
+        self._get_link = get_link
+        self._period = 1.0 / rate
+        self._timeout = timeout / 1000.0
+        self._swarm = swarm
+
+    def _decode(self, frames):
+        """
+        Decode a JSON or binary set-point to the URI (None if not in swarm
+        mode) and (roll, pitch, yaw, thrust)
+        """
+        uri = None
+        if len(frames) > 1:
+            uri = frames[0].decode("utf-8")
+        msg = frames[-1]
+        if msg[:1] == b"{":
+            cmd = json.loads(msg)
+            setpoint = (cmd["roll"], cmd["pitch"], cmd["yaw"], cmd["thrust"])
+            uri = cmd.get("uri", uri)
+        else:
+            setpoint = CTRL_STRUCT.unpack(msg)
+        if not self._swarm:
+            uri = None
+        return uri, setpoint
 
     def run(self):
+        # The latest set-point and when it was received, keyed by URI
+        setpoints = {}
+        deadline = time.monotonic() + self._period
         while True:
-            cmd = self._socket.recv_json()
-            self._cf.commander.send_setpoint(cmd["roll"], cmd["pitch"],
-                                             cmd["yaw"], cmd["thrust"])
+            timeout = max(0, deadline - time.monotonic())
+            if self._socket.poll(timeout * 1000):
+                # Drop all but the latest set-point
+                try:
+                    while True:
+                        frames = self._socket.recv_multipart(zmq.NOBLOCK)
+                        try:
+                            uri, setpoint = self._decode(frames)
+                            setpoints[uri] = (setpoint, time.monotonic())
+                        except Exception as e:
+                            logger.warning("Bad set-point: {}".format(e))
+                except zmq.Again:
+                    pass
+
+            now = time.monotonic()
+            if now < deadline:
+                continue
+            # Schedule on absolute deadlines so the rate does not drift, but
+            # skip the missed ones if we are late
+            deadline += self._period
+            if deadline < now:
+                deadline = now + self._period
+
+            for uri, (setpoint, received) in list(setpoints.items()):
+                link = self._get_link(uri)
+                if link is None:
+                    logger.warning("No Crazyflie with uri {}".format(uri))
+                    del setpoints[uri]
+                    continue
+                if now - received > self._timeout:
+                    logger.warning("No set-point for {} ms, stopping".format(
+                        int(self._timeout * 1000)))
+                    link.cf.commander.send_stop_setpoint()
+                    del setpoints[uri]
+                    continue
+                try:
+                    link.cf.commander.send_setpoint(*setpoint)
+                except Exception as e:
+                    logger.warning("Could not send set-point: {}".format(e))
+                    del setpoints[uri]
 
 
 class ZMQServer():
     """Crazyflie ZMQ server"""
 
-    def __init__(self, base_url, base_port):
+    def __init__(self, base_url, base_port, log_batch_size=1,
+                 log_batch_time=0, ctrl_rate=CTRL_RATE,
+                 ctrl_timeout=CTRL_TIMEOUT, swarm=False):
         """Start threads and bind ports"""
         cflib.crtp.init_drivers()
-        self._cf = Crazyflie(ro_cache=None,
-                             rw_cache=cfclient.config_path + "/cache")
 
         signal.signal(signal.SIGINT, signal.SIG_DFL)
 
         self._base_url = base_url
         self._context = zmq.Context()
 
-        cmd_srv = self._bind_zmq_socket(zmq.REP, "cmd",
+        cmd_srv = self._bind_zmq_socket(zmq.ROUTER, "cmd",
                                         base_port + ZMQ_SRV_PORT)
         log_srv = self._bind_zmq_socket(zmq.PUB, "log",
                                         base_port + ZMQ_LOG_PORT)
@@ -340,12 +781,20 @@ class ZMQServer():
                                          base_port + ZMQ_CONN_PORT)
 
         self._scan_thread = _SrvThread(cmd_srv, log_srv, param_srv, conn_srv,
-                                       self._cf)
+                                       self._create_cf, log_batch_size,
+                                       log_batch_time, swarm)
         self._scan_thread.start()
 
-        self._ctrl_thread = _CtrlThread(ctrl_srv, self._cf)
+        self._ctrl_thread = _CtrlThread(ctrl_srv, self._scan_thread.get_link,
+                                        ctrl_rate, ctrl_timeout, swarm)
         self._ctrl_thread.start()
 
+    def _create_cf(self):
+        # All the Crazyflies share the TOC cache, and the radio driver
+        # shares a Crazyradio between all the links using it
+        return Crazyflie(ro_cache=None,
+                         rw_cache=cfclient.config_path + "/cache")
+
     def _bind_zmq_socket(self, pattern, name, port):
         srv = self._context.socket(pattern)
         srv_addr = "{}:{}".format(self._base_url, port)
@@ -368,6 +817,24 @@ def main():
     parser.add_argument("-p", "--port", action="store", dest="port", type=int,
                         default=2000,
                         help="Base port to used for ZMQ sockets")
+    parser.add_argument("--log-batch-size", action="store",
+                        dest="log_batch_size", type=int, default=1,
+                        help="Number of log samples to send in each message, "
+                             "0 for no limit")
+    parser.add_argument("--log-batch-time", action="store",
+                        dest="log_batch_time", type=int, default=0,
+                        help="Max time (in ms) to hold log samples before "
+                             "sending them, 0 for no limit")
+    parser.add_argument("--ctrl-rate", action="store", dest="ctrl_rate",
+                        type=int, default=CTRL_RATE,
+                        help="Rate (in Hz) to send control set-points to the "
+                             "Crazyflie")
+    parser.add_argument("--ctrl-timeout", action="store",
+                        dest="ctrl_timeout", type=int, default=CTRL_TIMEOUT,
+                        help="Time (in ms) without new control set-points "
+                             "before the motors are stopped")
+    parser.add_argument("--swarm", action="store_true", dest="swarm",
+                        help="Handle several Crazyflies, selected by URI")
     (args, _) = parser.parse_known_args()
 
     if args.debug:
@@ -375,7 +842,8 @@ def main():
     else:
         logging.basicConfig(level=logging.INFO)
 
-    ZMQServer(args.url, args.port)
+    ZMQServer(args.url, args.port, args.log_batch_size, args.log_batch_time,
+              args.ctrl_rate, args.ctrl_timeout, args.swarm)
 
     # CRTL-C to exit
 
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2024 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License along with
+#  this program; if not, write to the Free Software Foundation, Inc., 51
+#  Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Benchmark of painting the attitude indicator of the Flight Control tab, with
+the roll and pitch changing between the frames like when flying.
+
+Run from the root of the repository, without a display use
+QT_QPA_PLATFORM=offscreen:
+
+    python3 tools/benchmark/attitude_indicator.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from PyQt6 import QtGui  # noqa: E402
+from PyQt6 import QtWidgets  # noqa: E402
+
+from cfclient.ui.widgets.ai import AttitudeIndicator  # noqa: E402
+
+SIZE = 400
+FRAMES = 500
+
+
+def main():
+    app = QtWidgets.QApplication(sys.argv)  # noqa: F841
+    indicator = AttitudeIndicator()
+    indicator.resize(SIZE, SIZE)
+    image = QtGui.QImage(SIZE, SIZE, QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+
+    start = time.perf_counter()
+    for i in range(FRAMES):
+        indicator.setRollPitch((i % 60) - 30, (i % 40) - 20, False)
+        indicator.setBaro(i / 100.0, False)
+        qp = QtGui.QPainter(image)
+        indicator.drawWidget(qp)
+        qp.end()
+    elapsed = time.perf_counter() - start
+
+    print("{:.2f} ms per frame ({}x{})".format(elapsed / FRAMES * 1000, SIZE, SIZE))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2024 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License along with
+#  this program; if not, write to the Free Software Foundation, Inc., 51
+#  Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Micro-benchmark of reading an input device, measuring the time spent in the
+input layer for each read (mapping the axes and buttons, limiting and the
+toggle checks done by JoystickReader) without any real device.
+
+Run from the root of the repository:
+
+    python3 tools/benchmark/input_read.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from cfclient.utils.input.inputreaders import InputDevice  # noqa: E402
+
+AXES = 6
+BUTTONS = 16
+READS = 100000
+
+
+class _Reader:
+    """Reader returning a gamepad like device with moving sticks"""
+
+    name = "benchmark"
+
+    def __init__(self):
+        self._count = 0
+        self._axes = [0.0] * AXES
+        self._buttons = [0] * BUTTONS
+
+    def read(self, device_id):
+        self._count += 1
+        self._axes[0] = (self._count % 200) / 100.0 - 1.0
+        self._axes[1] = -self._axes[0]
+        self._buttons[3] = (self._count // 50) % 2
+        return [self._axes, self._buttons]
+
+
+class _Input:
+    """The settings of the input layer used when limiting the input"""
+    max_rp_angle = 30
+    max_yaw_rate = 200
+    max_thrust = 80
+    min_thrust = 25
+    thrust_slew_limit = 45
+    thrust_slew_rate = 30
+    thrust_slew_enabled = True
+    springy_throttle = True
+    ASSISTED_CONTROL_ALTHOLD = 0
+    ASSISTED_CONTROL_HEIGHTHOLD = 2
+    ASSISTED_CONTROL_HOVER = 3
+
+    def get_assisted_control(self):
+        return self.ASSISTED_CONTROL_ALTHOLD
+
+
+def _input_map():
+    mapping = {}
+    for i, key in enumerate(("roll", "pitch", "yaw", "thrust")):
+        mapping["Input.AXIS-{}".format(i)] = {
+            "id": i, "key": key, "scale": 1.0, "offset": 0.0,
+            "type": "Input.AXIS"}
+    for i, key in enumerate(("estop", "alt1", "alt2", "assistedControl",
+                             "pitchNeg", "pitchPos", "rollNeg", "rollPos")):
+        mapping["Input.BUTTON-{}".format(i)] = {
+            "id": i, "key": key, "scale": 1.0, "type": "Input.BUTTON"}
+    return mapping
+
+
+def main():
+    device = InputDevice("benchmark", 0, _Reader())
+    device.input = _Input()
+    device.input_map = _input_map()
+
+    def read():
+        data = device.read()
+        # What JoystickReader looks at for each read
+        return (data.toggled.assistedControl, data.toggled.estop,
+                data.toggled.alt1, data.toggled.alt2,
+                data.toggled.pitchNeg, data.toggled.rollNeg,
+                data.roll, data.pitch, data.yaw, data.thrust)
+
+    best = min(timeit.repeat(read, number=READS, repeat=5))
+    print("{:.2f} us per read".format(best / READS * 1e6))
+
+
+if __name__ == "__main__":
+    main()
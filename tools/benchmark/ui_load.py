@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#     ||          ____  _ __
+#  +------+      / __ )(_) /_______________ _____  ___
+#  | 0xBC |     / __  / / __/ ___/ ___/ __ `/_  / / _ \
+#  +------+    / /_/ / / /_/ /__/ /  / /_/ / / /_/  __/
+#   ||  ||    /_____/_/\__/\___/_/   \__,_/ /___/\___/
+#
+#  Copyright (C) 2024 Bitcraze AB
+#
+#  Crazyflie Nano Quadcopter Client
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+
+#  You should have received a copy of the GNU General Public License along with
+#  this program; if not, write to the Free Software Foundation, Inc., 51
+#  Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+Benchmark of loading all the .ui files of the client, with uic.loadUiType()
+as done when importing the modules before, and with the ui cache when it is
+empty (first start) and when it has been filled.
+
+Run from the root of the repository:
+
+    python3 tools/benchmark/ui_load.py
+"""
+
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+import cfclient  # noqa: E402
+from cfclient.utils import uicache  # noqa: E402
+from PyQt6 import uic  # noqa: E402
+
+RUNS = 5
+
+
+def _load_all(load, ui_files):
+    start = time.perf_counter()
+    for ui_file in ui_files:
+        load(ui_file)
+    return time.perf_counter() - start
+
+
+def main():
+    ui_files = sorted(glob.glob(os.path.join(cfclient.module_path, "ui", "**",
+                                             "*.ui"), recursive=True))
+
+    runtime = min(_load_all(uic.loadUiType, ui_files) for _ in range(RUNS))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        uicache.CACHE_DIR = cache_dir
+        first = _load_all(uicache.load_ui_type, ui_files)
+        cached = min(_load_all(uicache.load_ui_type, ui_files)
+                     for _ in range(RUNS))
+
+    print("{} .ui files".format(len(ui_files)))
+    print("uic.loadUiType:       {:.1f} ms".format(runtime * 1000))
+    print("ui cache, first load: {:.1f} ms".format(first * 1000))
+    print("ui cache, cached:     {:.1f} ms".format(cached * 1000))
+
+
+if __name__ == "__main__":
+    main()